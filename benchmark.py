@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Headless benchmarks for Ghost Pet's render and animation hot paths.
+
+Renders N frames of every animation state into a QImage under the
+offscreen platform and reports per-frame time percentiles, Python
+allocations and peak RSS as JSON.
+
+    python3 benchmark.py --frames 500 -o bench.json
+    python3 benchmark.py --compare old.json
+
+--replay runs a session recorded with `ghost_pet.py --record` instead:
+the same ghost behavior every time, so paint and tick times from two
+builds compare like for like.
+
+    python3 benchmark.py --replay session.trace -o replay.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("GHOST_PET_QPA_PLATFORM", "offscreen")
+# Benchmark with default settings, not whatever the user has configured
+os.environ["XDG_CONFIG_HOME"] = tempfile.mkdtemp(prefix="ghost-pet-bench-")
+
+import ghost_pet
+import ghost_trace
+from frame_clock import FrameClock
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import Qt, QT_VERSION_STR, PYQT_VERSION_STR
+from PyQt5.QtGui import QImage
+
+
+def _states(now):
+    """Animation states to benchmark, as GhostState attribute overrides."""
+    return {
+        "idle": {},
+        "blink_closed": {"blinking": True, "blink_style": "closed"},
+        "blink_squint": {"blinking": True, "blink_style": "squint"},
+        "sparkle": {"sparkle_active": True, "sparkle_start": now},
+        "mouth_o": {"mouth": "O", "mouth_start": now},
+        "mouth_happy": {"mouth": "happy", "mouth_start": now},
+        "arms": {"arms_active": True, "arms_start": now},
+        "bubble": {"bubble_active": True,
+                   "bubble_msg": "I'm having a fang-tastic day!",
+                   "bubble_width": 330},
+        "facing_left": {"direction": -1},
+        "scare": {"scare_active": True, "scare_start": now,
+                  "scare_duration": 5.0, "bubble_active": True,
+                  "bubble_msg": "BOO!!", "bubble_width": 150},
+    }
+
+
+def _percentiles(samples_ns):
+    ms = sorted(x / 1e6 for x in samples_ns)
+
+    def pct(p):
+        return ms[min(len(ms) - 1, int(round(p / 100 * (len(ms) - 1))))]
+
+    return {
+        "mean_ms": statistics.fmean(ms),
+        "p50_ms": pct(50),
+        "p90_ms": pct(90),
+        "p99_ms": pct(99),
+        "max_ms": ms[-1],
+    }
+
+
+def _time_calls(fn, frames):
+    samples = []
+    clock = time.perf_counter_ns
+    for _ in range(frames):
+        t0 = clock()
+        fn()
+        samples.append(clock() - t0)
+    return samples
+
+
+def _alloc_per_call(fn, frames):
+    """Mean net and peak traced bytes allocated per call."""
+    tracemalloc.start()
+    try:
+        net = peak = 0
+        for _ in range(frames):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            fn()
+            after, top = tracemalloc.get_traced_memory()
+            net += after - before
+            peak += top - before
+    finally:
+        tracemalloc.stop()
+    return {"alloc_net_bytes": net / frames, "alloc_peak_bytes": peak / frames}
+
+
+def _bench(fn, frames):
+    fn()  # warm caches (sprite atlas, fonts)
+    result = _percentiles(_time_calls(fn, frames))
+    result.update(_alloc_per_call(fn, max(1, frames // 10)))
+    return result
+
+
+def run(frames, scales):
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    config = ghost_pet.Config()
+    results = {}
+
+    for scale in scales:
+        config.ghost_scale = scale
+        # Paused and never started: time only moves through clock.step()
+        clock = FrameClock(paused=True)
+        ghost = ghost_pet.GhostPet(config, clock=clock)
+        ghost.apply_config()
+        state = ghost.state
+        image = QImage(ghost.size(), QImage.Format_ARGB32_Premultiplied)
+        baseline = {k: getattr(state, k)
+                    for attrs in _states(0).values() for k in attrs}
+
+        def paint():
+            # Advance animation time only; no events fire
+            state.t += 1 / 30
+            image.fill(Qt.transparent)
+            ghost.render(image)
+
+        for name, attrs in _states(state.t).items():
+            for k, v in baseline.items():
+                setattr(state, k, v)
+            for k, v in attrs.items():
+                setattr(state, k, v)
+            state.opacity = 1.0
+            results[f"paint/{name}@{scale:g}"] = _bench(paint, frames)
+
+        for k, v in baseline.items():
+            setattr(state, k, v)
+        results[f"update_float@{scale:g}"] = _bench(
+            state._update_float, frames)
+        results[f"state_step@{scale:g}"] = _bench(
+            lambda: state.step(1 / 30), frames)
+        # A full frame: clock, simulation (events included), damage
+        results[f"tick@{scale:g}"] = _bench(lambda: clock.step(1 / 30), frames)
+        state.scare_active = True
+        state.scare_start = state.t
+        state.scare_duration = 3600.0  # never finishes mid-benchmark
+        results[f"scare_tick@{scale:g}"] = _bench(state._scare_tick, frames)
+        ghost.deleteLater()
+        app.processEvents()
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "pyqt": PYQT_VERSION_STR,
+            "platform": app.platformName(),
+            "machine": platform.machine(),
+            "frames": frames,
+            "scales": scales,
+        },
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "results": results,
+    }
+
+
+def run_replay(path, fps):
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    trace = ghost_trace.load(path)
+    config = ghost_pet.Config()
+    ghost_trace.restore_config(config, trace.config)
+    clock = FrameClock(paused=True)
+    ghost = ghost_pet.GhostPet(config, clock=clock, bounds=trace.bounds,
+                               rng=random.Random(trace.seed))
+    image = None
+    ticks, paints = [], []
+    perf = time.perf_counter_ns
+    step = clock.step
+
+    def timed_step(dt):
+        t0 = perf()
+        step(dt)
+        ticks.append(perf() - t0)
+
+    def paint():
+        nonlocal image
+        # Full repaint of the window; its size follows ghost_scale
+        if image is None or image.size() != ghost.size():
+            image = QImage(ghost.size(), QImage.Format_ARGB32_Premultiplied)
+        t0 = perf()
+        image.fill(Qt.transparent)
+        ghost.render(image)
+        paints.append(perf() - t0)
+
+    clock.step = timed_step
+    t0 = perf()
+    events = ghost_trace.replay(trace, ghost, clock, fps, on_frame=paint)
+    wall = (perf() - t0) / 1e9
+    mismatch = ghost_trace.compare(trace.events, events)
+    if mismatch is not None:
+        expected = trace.events[mismatch]
+        got = events[mismatch] if mismatch < len(events) else None
+        print(f"warning: replay diverged at event {mismatch}: "
+              f"expected {expected}, got {got}", file=sys.stderr)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "pyqt": PYQT_VERSION_STR,
+            "platform": app.platformName(),
+            "machine": platform.machine(),
+            "trace": os.path.abspath(path),
+            "fps": fps,
+            "frames": len(paints),
+            "session_s": ghost.state.t,
+            "wall_s": wall,
+            "events": len(trace.events),
+            "diverged_at": mismatch,
+        },
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "results": {
+            "replay/paint": _percentiles(paints),
+            "replay/tick": _percentiles(ticks),
+        },
+    }
+
+
+def _print_table(report, baseline=None):
+    old = baseline["results"] if baseline else {}
+    print(f"{'benchmark':32} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}"
+          f" {'alloc B':>9}" + ("   p50 vs base" if baseline else ""))
+    for name, r in report["results"].items():
+        alloc = r.get("alloc_peak_bytes")
+        line = (f"{name:32} {r['p50_ms']:8.3f} {r['p90_ms']:8.3f}"
+                f" {r['p99_ms']:8.3f}"
+                + (f" {alloc:9.0f}" if alloc is not None else f" {'-':>9}"))
+        if name in old and old[name]["p50_ms"] > 0:
+            line += f"   {r['p50_ms'] / old[name]['p50_ms']:6.2f}x"
+        print(line)
+    print(f"peak RSS: {report['peak_rss_kb'] / 1024:.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--frames", type=int, default=300,
+                        help="frames per benchmark (default: 300)")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1.0, 3.0],
+                        help="ghost_scale values to run (default: 1 3)")
+    parser.add_argument("-o", "--output", metavar="FILE",
+                        help="write the JSON report to FILE")
+    parser.add_argument("--compare", metavar="FILE",
+                        help="show p50 ratios against an earlier JSON report")
+    parser.add_argument("--replay", metavar="TRACE",
+                        help="time a session recorded with ghost_pet.py "
+                             "--record instead of the fixed states")
+    parser.add_argument("--fps", type=float, default=30.0,
+                        help="frame rate for --replay (default: 30)")
+    args = parser.parse_args()
+
+    if args.replay:
+        report = run_replay(args.replay, args.fps)
+    else:
+        report = run(args.frames, args.scales)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    _print_table(report, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Single frame clock driving all of Ghost Pet's animation and timers.
+
+Instead of one QTimer per behavior, everything is scheduled on one
+FrameClock: a per-frame tick for continuous animation plus a heap of
+timed events. The clock arms a single timer for whichever comes first,
+so the process wakes once per frame (or once per event while idle).
+
+Clock time is monotonic seconds from time.monotonic_ns(), and it can be
+paused, sped up or slowed down, and stepped by hand. It is sampled once
+per frame: while a frame runs, now() returns that frame's timestamp,
+so everything animated in one frame agrees on the time. Event due
+times are in clock time, so pausing holds every countdown where it is.
+"""
+
+import math
+import time
+
+from PyQt5.QtCore import Qt, QObject, QTimer
+
+from scheduler import EventQueue
+
+
+class FrameClock(QObject):
+    """One timer for per-frame callbacks and scheduled events.
+
+    Frame callbacks receive (now, dt) in seconds. Events are scheduled
+    with call_later()/call_every() and return an Event handle that can
+    be cancelled.
+
+    pause()/resume() freeze clock time (no frames, no events),
+    set_time_scale() runs it faster or slower than real time, and
+    step(dt) advances it by exactly dt and runs one frame, for
+    benchmarks and deterministic runs. A clock created paused starts at
+    exactly 0, so such runs line up to the nanosecond.
+    """
+
+    def __init__(self, fps=30, parent=None, paused=False):
+        super().__init__(parent)
+        self._fps = fps
+        self._fps_requests = {}
+        self._frame_callbacks = []
+        self._events = EventQueue()
+        self._last_frame = None
+        self._next_frame = 0.0
+        self._in_tick = False
+        self._running = False
+
+        # Clock time is _time_ns at wall time _anchor_ns, advancing at
+        # _scale from there unless paused
+        self._time_ns = 0
+        self._anchor_ns = time.monotonic_ns()
+        self._scale = 1.0
+        self._paused = paused
+        # now() while a frame runs
+        self._frame_time = None
+        # Timer wakeups and frames run so far, for profiling
+        self.wakeups = 0
+        self.frames = 0
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._tick)
+
+    # ── scheduling ───────────────────────────────────────────────
+
+    def now(self):
+        """Clock time in seconds; fixed for the duration of a frame."""
+        if self._frame_time is not None:
+            return self._frame_time
+        return self._clock_ns() / 1e9
+
+    def _clock_ns(self):
+        if self._paused:
+            return self._time_ns
+        elapsed = time.monotonic_ns() - self._anchor_ns
+        return self._time_ns + int(elapsed * self._scale)
+
+    def _rebase(self):
+        """Restart time scaling from the current clock time."""
+        self._time_ns = self._clock_ns()
+        self._anchor_ns = time.monotonic_ns()
+
+    def add_frame_callback(self, callback):
+        self._frame_callbacks.append(callback)
+        self._rearm()
+
+    def remove_frame_callback(self, callback):
+        if callback in self._frame_callbacks:
+            self._frame_callbacks.remove(callback)
+
+    def call_later(self, delay, callback):
+        """Run callback once after delay seconds."""
+        ev = self._events.schedule(self.now() + delay, callback)
+        self._rearm()
+        return ev
+
+    def call_every(self, interval, callback):
+        """Run callback every interval seconds until cancelled."""
+        ev = self._events.schedule(self.now() + interval, callback, interval)
+        self._rearm()
+        return ev
+
+    # ── running ──────────────────────────────────────────────────
+
+    @property
+    def fps(self):
+        return self._fps
+
+    def set_fps(self, fps):
+        """Change the frame rate; 0 means wake for events only."""
+        if fps == self._fps:
+            return
+        self._fps = fps
+        if fps > 0:
+            # Speeding up shouldn't wait out the old, longer period
+            base = self.now() if self._last_frame is None else self._last_frame
+            self._next_frame = min(max(self._next_frame, base), base + 1.0 / fps)
+        self._rearm()
+
+    def request_fps(self, owner, fps):
+        """Ask for at least fps; the clock runs at the highest request."""
+        self._fps_requests[owner] = fps
+        self.set_fps(max(self._fps_requests.values()))
+
+    # ── time base ────────────────────────────────────────────────
+
+    @property
+    def paused(self):
+        return self._paused
+
+    def pause(self):
+        """Freeze clock time: no frames and no events until resume()."""
+        if self._paused:
+            return
+        self._rebase()
+        self._paused = True
+        self._timer.stop()
+
+    def resume(self):
+        if not self._paused:
+            return
+        self._rebase()
+        self._paused = False
+        # The first frame after a pause shouldn't see the pause as dt
+        self._last_frame = None
+        self._next_frame = self.now()
+        self._rearm()
+
+    @property
+    def time_scale(self):
+        return self._scale
+
+    def set_time_scale(self, scale):
+        """Run clock time at scale x real time (e.g. 0.5 = slow motion)."""
+        if scale <= 0:
+            raise ValueError("time scale must be positive; use pause()")
+        self._rebase()
+        self._scale = scale
+        self._rearm()
+
+    def step(self, dt):
+        """Advance clock time by dt seconds and run one frame now."""
+        self._rebase()
+        self._time_ns += round(dt * 1e9)
+        self._tick(force_frame=True)
+
+    def start(self):
+        self._running = True
+        self._last_frame = None
+        self._next_frame = self.now()
+        self._rearm()
+
+    def stop(self):
+        self._running = False
+        self._timer.stop()
+
+    def _tick(self, force_frame=False):
+        self._in_tick = True
+        self.wakeups += 1
+        now = self._frame_time = self._clock_ns() / 1e9
+        try:
+            if self._frame_callbacks and (force_frame or (
+                    self._fps > 0 and now >= self._next_frame)):
+                dt = 0.0 if self._last_frame is None else now - self._last_frame
+                self._last_frame = now
+                period = 1.0 / self._fps if self._fps > 0 else 0.0
+                self._next_frame += period
+                if self._next_frame <= now:
+                    # Fell behind (suspend, slow frame) — don't catch up
+                    self._next_frame = now + period
+                self.frames += 1
+                for callback in list(self._frame_callbacks):
+                    callback(now, dt)
+            self._events.run_due(now)
+        finally:
+            self._in_tick = False
+            self._frame_time = None
+        self._rearm()
+
+    def _rearm(self):
+        if not self._running or self._in_tick or self._paused:
+            return
+        wake = math.inf
+        if self._frame_callbacks and self._fps > 0:
+            wake = self._next_frame
+        due = self._events.next_due()
+        if due is not None:
+            wake = min(wake, due)
+        if wake == math.inf:
+            self._timer.stop()
+            return
+        # Clock seconds to real milliseconds
+        ms = max(0, math.ceil((wake - self.now()) * 1000 / self._scale))
+        self._timer.start(ms)
@@ -0,0 +1,175 @@
+"""Render a ghost session to an animated image, without opening a window.
+
+ghost_pet.py --export-animation OUT paints a time range of a session
+frame by frame through GhostPet's own paintEvent into QImages, on the
+offscreen platform. The session is a trace recorded with --record, or by
+default a seeded one that follows SCRIPT: the greeting at 1 s, then a
+scare at 3 s.
+
+Every GhostPet built from the same trace behaves identically (see
+ghost_trace.py), so the frames are split into chunks that a process pool
+renders independently. Each worker builds its own ghost and steps it
+through the same frames as a single sequential render would, painting
+only its own chunk, so the output doesn't depend on the number of
+workers. Stepping without painting is cheap next to painting. Workers
+return their frames PNG-encoded.
+
+The extension of OUT picks the format: .gif, .png (APNG) or .webp, all
+written with Pillow. An existing directory instead gets numbered PNG
+frames, which needs no Pillow. GIF has no partial transparency, so GIF
+frames are flattened onto GIF_BACKGROUND.
+
+GIF frame delays are whole centiseconds, and browsers slow anything
+under 2 cs down to 10 cs, so a GIF is rendered at the nearest rate with
+a whole delay of at least 2 cs (50 fps at most; see frame_rate()).
+"""
+
+import io
+import math
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import ghost_trace
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+FORMATS = {".gif": "GIF", ".png": "PNG", ".webp": "WEBP"}
+GIF_BACKGROUND = (32, 32, 48)
+
+DEFAULT_FPS = 60.0
+# Shortest GIF delay browsers play as is, in centiseconds; also the default
+GIF_MIN_DELAY = 2
+
+# Inputs of a seeded session, on top of what the ghost does by itself
+SCRIPT = [{"t": 3.0, "input": "scare"}]
+BOUNDS = (0, 0, 1920, 1080)
+
+# Chunks per worker: more balance the load, fewer rebuild fewer ghosts
+CHUNKS_PER_WORKER = 2
+
+
+def scripted_trace(config, seed):
+    """A session from config and seed, with the SCRIPT inputs."""
+    return ghost_trace.Trace(seed, BOUNDS, ghost_trace.config_snapshot(config),
+                             list(SCRIPT), [])
+
+
+def output_format(path):
+    """Pillow format name for path, or None for a frame directory."""
+    if os.path.isdir(path):
+        return None
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(
+            f"{path}: expected a .gif, .png or .webp file, or a directory")
+    if Image is None:
+        raise RuntimeError(
+            f"writing {fmt} needs Pillow; give a directory for PNG frames")
+    return fmt
+
+
+def frame_rate(path, fps=None):
+    """Frame rate an export to path renders at, for a requested fps."""
+    if output_format(path) != "GIF":
+        return fps or DEFAULT_FPS
+    if fps is None:
+        return 100 / GIF_MIN_DELAY
+    return 100 / max(GIF_MIN_DELAY, round(100 / fps))
+
+
+_app = None
+
+
+def _render_chunk(trace, times, lo, hi):
+    """PNG bytes of the frames at times[lo:hi]; runs in a worker."""
+    global _app
+    import ghost_pet
+    from frame_clock import FrameClock
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import Qt, QBuffer, QByteArray, QIODevice
+    from PyQt5.QtGui import QImage
+
+    if _app is None:
+        # Set here, not only for ghost_pet: it may have been imported
+        # (choosing xcb) before this process knew it was a worker
+        os.environ["QT_QPA_PLATFORM"] = "offscreen"
+        _app = QApplication.instance() or QApplication(["ghost-pet-export"])
+    config = ghost_pet.Config()
+    ghost_trace.restore_config(config, trace.config)
+    # Paused and never started: time only moves through clock.step()
+    clock = FrameClock(paused=True)
+    ghost = ghost_pet.GhostPet(config, clock=clock, bounds=trace.bounds,
+                               rng=random.Random(trace.seed))
+    frames = []
+    index = 0
+
+    def grab():
+        nonlocal index
+        index += 1
+        if index <= lo:
+            return
+        image = QImage(ghost.size(), QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        ghost.render(image)
+        data = QByteArray()
+        buf = QBuffer(data)
+        buf.open(QIODevice.WriteOnly)
+        image.save(buf, "PNG")
+        frames.append(bytes(data))
+
+    ghost_trace.drive(trace, ghost, clock, times[:hi], grab)
+    ghost.deleteLater()
+    return frames
+
+
+def render_frames(trace, start, duration, fps, workers=None):
+    """PNG bytes of every frame in [start, start + duration)."""
+    count = max(1, round(duration * fps))
+    times = [start + i / fps for i in range(count)]
+    workers = min(workers or os.cpu_count() or 1, count)
+    size = math.ceil(count / (workers * CHUNKS_PER_WORKER))
+    # Workers are spawned, not forked: a forked Qt is not safe to use
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context) as pool:
+        chunks = [pool.submit(_render_chunk, trace, times, lo,
+                              min(lo + size, count))
+                  for lo in range(0, count, size)]
+        return [frame for chunk in chunks for frame in chunk.result()]
+
+
+def write_animation(path, frames, fps):
+    """Write PNG-encoded frames to path (see output_format)."""
+    fmt = output_format(path)
+    if fmt is None:
+        for i, png in enumerate(frames):
+            with open(os.path.join(path, f"frame-{i:05d}.png"), "wb") as f:
+                f.write(png)
+        return
+
+    images = [Image.open(io.BytesIO(png)).convert("RGBA") for png in frames]
+    if fmt == "GIF":
+        background = Image.new("RGBA", images[0].size, GIF_BACKGROUND + (255,))
+        images = [Image.alpha_composite(background, im).convert("RGB")
+                  for im in images]
+    options = {"save_all": True, "append_images": images[1:], "loop": 0,
+               "duration": round(1000 / fps)}
+    if fmt == "WEBP":
+        options["quality"] = 90
+    images[0].save(path, fmt, **options)
+
+
+def export_animation(path, trace, start=0.0, duration=10.0, fps=None,
+                     workers=None):
+    """Render a time range of trace to path; returns the frame count.
+
+    fps is adjusted as frame_rate() says; None picks the format's default.
+    """
+    fps = frame_rate(path, fps)     # also fails before rendering
+    frames = render_frames(trace, start, duration, fps, workers)
+    write_animation(path, frames, fps)
+    return len(frames)
@@ -0,0 +1,198 @@
+"""Multi-ghost mode: many ghosts drawn through shared overlay windows.
+
+A GhostFlock steps N GhostStates from one frame clock and draws them
+into one transparent, input-transparent overlay window per screen. Every
+ghost shares the same sprite atlas, and the overlays batch the drawing
+with QPainter.drawPixmapFragments, so the cost per extra ghost is a few
+fragments rather than a window, a repaint and a set of timers.
+"""
+
+import functools
+
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtCore import Qt, QObject
+from PyQt5.QtGui import QPainter, QRegion
+
+import ghost_render
+import separation
+from ghost_state import GhostState
+
+
+class GhostOverlay(QWidget):
+    """Transparent window covering one screen.
+
+    Painting is delegated to flock.draw(painter, area), with the painter
+    translated to screen coordinates.
+    """
+
+    def __init__(self, flock, geometry):
+        super().__init__()
+        self._flock = flock
+
+        # Same flags as GhostPet: behind other windows, never takes input
+        self.setWindowFlags(
+            Qt.FramelessWindowHint |
+            Qt.Tool |
+            Qt.WindowTransparentForInput
+        )
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.setAttribute(Qt.WA_ShowWithoutActivating)
+        self.setGeometry(geometry)
+
+    def paintEvent(self, event):
+        origin = self.geometry().topLeft()
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing,
+                              self._flock.config.power.antialias)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        # Draw in screen coordinates
+        painter.translate(-origin.x(), -origin.y())
+        self._flock.draw(painter, event.rect().translated(origin))
+
+
+def warm_overlays(atlas, overlays, scale):
+    """Fill atlas for every pixel ratio among the overlays' screens."""
+    for ratio in sorted({o.devicePixelRatioF() for o in overlays}):
+        atlas.warm(scale * ratio)
+
+
+class GhostFlock(QObject):
+    """N ghosts sharing one frame clock, one atlas and per-screen overlays."""
+
+    def __init__(self, config, count, rects, clock, atlas=None, rng=None):
+        super().__init__()
+        self.config = config
+        self._clock = clock
+        self.atlas = atlas or ghost_render.SpriteAtlas()
+        self._scale = config.ghost_scale
+
+        bounds = (min(r.x() for r in rects),
+                  min(r.y() for r in rects),
+                  max(r.x() + r.width() for r in rects),
+                  max(r.y() + r.height() for r in rects))
+        self.states = []
+        for _ in range(count):
+            st = GhostState(config, bounds, rng=rng, clock=clock.now,
+                            measure=ghost_render.bubble_text.width)
+            st.listeners.append(functools.partial(self._on_state_event, st))
+            self.states.append(st)
+
+        self.overlays = [GhostOverlay(self, rect) for rect in rects]
+        # Screen rect each ghost was last drawn at, for partial repaints
+        self._drawn = {}
+        self._dirty = QRegion()
+        self._scaring = 0
+        self._grid = separation.SpatialHash(separation.RADIUS)
+
+        # A single wakeup for the earliest pending event of any ghost;
+        # _tick steps them all, so one wake serves every ghost
+        self._wake = None
+
+        clock.add_frame_callback(self._on_frame)
+        clock.call_later(0, lambda: warm_overlays(self.atlas, self.overlays,
+                                                  self.config.ghost_scale))
+        self._tick()
+
+    def show(self):
+        for overlay in self.overlays:
+            overlay.show()
+
+    def draw(self, painter, area):
+        """Draw the ghosts touching area (screen coordinates)."""
+        scale = self.config.ghost_scale
+        ghosts = [st for st in self.states
+                  if ghost_render.ghost_screen_rect(st, scale).intersects(area)]
+        if ghosts:
+            ghost_render.draw_ghost_batch(painter, ghosts, self.atlas, scale)
+
+    def apply_config(self):
+        """Apply config changes live without restart."""
+        for st in self.states:
+            st.apply_config()
+        if self.config.ghost_scale != self._scale:
+            self._scale = self.config.ghost_scale
+            self.atlas.clear()
+        self._tick()
+
+    def apply_power(self):
+        """Apply a new power profile: frame rate cap and antialiasing."""
+        for overlay in self.overlays:
+            overlay.update()
+        self._tick()
+
+    def _do_scare(self):
+        """Scare with every ghost at once."""
+        for st in self.states:
+            st.scare()
+        self._tick()
+
+    # ── animation ────────────────────────────────────────────────
+
+    def _on_frame(self, now, dt):
+        self._tick()
+
+    def _tick(self):
+        scale = self.config.ghost_scale
+        fps = 0
+        separation.apply(self.states, self.config, self._grid)
+        for st in self.states:
+            st.step()
+            rect = ghost_render.ghost_screen_rect(st, scale)
+            old = self._drawn.get(id(st))
+            if rect != old:
+                self._dirty += rect
+                if old is not None:
+                    self._dirty += old
+                self._drawn[id(st)] = rect
+            elif not st.is_faded():
+                # Tail wave and effects animate in place
+                self._dirty += rect
+            fps = max(fps, st.frame_rate())
+        self._flush()
+        self._schedule_wake()
+        self._clock.request_fps(self, fps)
+
+    def _flush(self):
+        """Repaint only the parts of each overlay that changed."""
+        if self._dirty.isEmpty():
+            return
+        for overlay in self.overlays:
+            geo = overlay.geometry()
+            part = self._dirty.intersected(geo)
+            if not part.isEmpty():
+                overlay.update(part.translated(-geo.x(), -geo.y()))
+        self._dirty = QRegion()
+
+    def _schedule_wake(self):
+        """Make sure the clock wakes up for the next event of any ghost."""
+        # Each state keeps its own time base, so compare delays, not dues
+        delays = [due - st.t for st in self.states
+                  for due in (st.next_event_due(),) if due is not None]
+        if not delays:
+            if self._wake is not None:
+                self._wake.cancel()
+            self._wake = None
+            return
+        when = self._clock.now() + max(0.0, min(delays))
+        wake = self._wake
+        if wake is not None and wake.active and abs(wake.due - when) < 1e-6:
+            return
+        if wake is not None:
+            wake.cancel()
+        self._wake = self._clock.call_later(when - self._clock.now(), self._tick)
+
+    def _on_state_event(self, st, name, data):
+        if name == "scare":
+            self._scaring += 1
+            # Pop to front of all windows
+            for overlay in self.overlays:
+                overlay.raise_()
+        elif name == "scare_end":
+            self._scaring -= 1
+            if not self._scaring:
+                # Sink back behind windows
+                for overlay in self.overlays:
+                    overlay.lower()
+        rect = self._drawn.get(id(st))
+        if rect is not None:
+            self._dirty += rect
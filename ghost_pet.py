@@ -7,22 +7,42 @@ A friendly ghost that floats around your desktop and says cute things!
 import argparse
 import json
 import os
-os.environ["QT_QPA_PLATFORM"] = "xcb"
+import random
+# Force X11 (XWayland on Wayland sessions); GHOST_PET_QPA_PLATFORM lets
+# headless tools pick e.g. "offscreen" instead.
+os.environ["QT_QPA_PLATFORM"] = os.environ.get("GHOST_PET_QPA_PLATFORM", "xcb")
 
 import sys
-import random
-import math
-import time
 
-# Path setup for settings_dialog import (local dev + Flatpak)
+# Path setup for local module imports (local dev + Flatpak)
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 _flatpak_lib = os.path.join(sys.prefix, "lib", "ghost-pet")
 if os.path.isdir(_flatpak_lib):
     sys.path.insert(0, _flatpak_lib)
 
 from PyQt5.QtWidgets import QApplication, QWidget, QSystemTrayIcon, QMenu
-from PyQt5.QtCore import Qt, QTimer, QRect
-from PyQt5.QtGui import QPainter, QColor, QPainterPath, QFont, QBrush, QPen, QIcon, QPixmap
+from PyQt5.QtCore import Qt, QRectF, QPointF
+from PyQt5.QtGui import QPainter, QColor, QPainterPath, QBrush, QPen, QIcon, QPixmap, QRegion
+
+try:
+    from PyQt5.QtX11Extras import QX11Info
+except ImportError:  # PyQt5 built without X11 extras
+    QX11Info = None
+
+import ghost_render
+import power
+import separation
+from frame_clock import FrameClock
+from ghost_state import GhostState
+from idle_monitor import IdleMonitor
+from occlusion import OcclusionMonitor
+
+
+def _compositor_running():
+    """True if a compositing manager will honor window opacity."""
+    if QX11Info is None or not QX11Info.isPlatformX11():
+        return False
+    return QX11Info.isCompositingManagerRunning()
 
 
 class Config:
@@ -39,6 +59,11 @@ class Config:
         "scare_min_minutes": 5,
         "scare_max_minutes": 10,
         "ghost_scale": 1.0,
+        "fps_active": 30,
+        "fps_drift": 15,
+        "fps_faded": 2,
+        "separation": True,
+        "power_profile": "auto",
         "custom_phrases": [],
         "custom_scare_phrases": [],
     }
@@ -52,6 +77,8 @@ class Config:
         self._config_file = os.path.join(self._config_dir, "config.json")
         for k, v in self.DEFAULTS.items():
             setattr(self, k, list(v) if isinstance(v, list) else v)
+        # Picked from the power supply for power_profile "auto"; not saved
+        self.auto_profile = "performance"
         self.load()
 
     def load(self):
@@ -77,102 +104,72 @@ class Config:
     def as_dict(self):
         return {k: getattr(self, k) for k in self.DEFAULTS}
 
+    @property
+    def power(self):
+        """The power.Profile in effect."""
+        name = self.power_profile
+        if name == "auto":
+            name = self.auto_profile
+        return power.PROFILES.get(name, power.PROFILES["performance"])
+
+
+# The "O" mouth's area including its shake
+_SHAKE_RECT = ghost_render.MOUTH_RECT.adjusted(-2, -1, 2, 1)
+
+# Ghost-box area each state event changes
+_EVENT_DAMAGE = {
+    "blink": ghost_render.FACE_RECT,
+    "blink_end": ghost_render.FACE_RECT,
+    "sparkle": ghost_render.FACE_RECT,
+    "sparkle_end": ghost_render.FACE_RECT,
+    "mouth": _SHAKE_RECT,
+    "mouth_end": _SHAKE_RECT,
+    "arms": ghost_render.ARMS_RECT,
+    "arms_end": ghost_render.ARMS_RECT,
+}
+
+
+def screen_rects(monitor_filter=None):
+    """Geometry of screens, optionally filtered by manufacturer."""
+    rects = []
+    for screen in QApplication.screens():
+        if monitor_filter and monitor_filter.lower() not in screen.manufacturer().lower():
+            continue
+        rects.append(screen.geometry())
+
+    if not rects:
+        # Fallback to primary screen
+        screen = QApplication.primaryScreen().geometry()
+        rects.append(screen)
+    return rects
+
+
+def screen_bounds(rects):
+    """(x, y, right, bottom) bounding box of rects."""
+    return (min(r.x() for r in rects),
+            min(r.y() for r in rects),
+            max(r.x() + r.width() for r in rects),
+            max(r.y() + r.height() for r in rects))
+
 
 class GhostPet(QWidget):
-    """A cute floating ghost desktop pet."""
+    """A cute floating ghost desktop pet.
+
+    The widget only presents a GhostState: it steps the simulation from
+    the shared frame clock, moves the window and paints the result.
+    """
 
     # Base widget dimensions (before scaling)
-    _BASE_W = 220
-    _BASE_H = 210
-
-    SCARE_PHRASES = [
-        "BOO!!",
-        "Did I scare you?",
-        "Behind you!!",
-        "I see you~",
-        "*jumps out*",
-        "Peek-a-boo!",
-        "Miss me?",
-        "Surprise!!",
-        "Gotcha!",
-        "Still here~",
-        "You can't escape me!",
-        "I never left...",
-        "*appears menacingly*",
-        "Thought you lost me?",
-        "Guess who!",
-        "You looked away...",
-        "I was here the whole time",
-        "*materializes*",
-        "Boo from the beyond!",
-        "Can't get rid of me~",
-        "The walls have eyes!",
-        "*emerges from screen*",
-        "Right behind you!",
-        "I haunt this desktop now",
-        "Feeling a chill?",
-        "*phases into reality*",
-        "You forgot about me!",
-        "Knock knock... BOO!",
-        "The ghost is back!",
-        "I'm always watching~",
-    ]
-
-    PHRASES = [
-        "Boo! ~",
-        "I'm friendly!",
-        "*floats happily*",
-        "Spooky vibes~",
-        "Want a hug?",
-        "I like you!",
-        "*wiggles*",
-        "So cozy here~",
-        "Hewwo!",
-        "*happy ghost noises*",
-        "You're doing great!",
-        "Take a break?",
-        "Stay hydrated!",
-        "*peeks at you*",
-        "Boop!",
-        "I believe in you!",
-        "*sparkles*",
-        "Keep going!",
-        "You got this!",
-        "*floats around*",
-        "I'm here for the boos!",
-        "You're my ghoul friend~",
-        "I'm dead tired...",
-        "Just passing through!",
-        "Life is un-boo-lievable!",
-        "I've got spirit!",
-        "Don't ghost me!",
-        "Creeping it real~",
-        "Haunt you later!",
-        "If you got it, haunt it!",
-        "I'm having a fang-tastic day!",
-        "Ghosting is my thing~",
-        "You look boo-tiful!",
-        "I'm a little ghoul-ish~",
-        "Spook-tacular vibes!",
-        "The ghoul next door~",
-        "I ain't afraid of no work!",
-        "Fangs for being here!",
-        "Having a wail of a time!",
-        "*phases through wall*",
-        "Boo-lieve in yourself!",
-        "I'm just a lost soul~",
-        "Eek-xcuse me!",
-        "*rattles chains cutely*",
-        "I'm dead serious rn",
-        "That was eerie-sistible!",
-        "Ghouls just wanna have fun!",
-    ]
-
-    def __init__(self, config, monitor_filter=None):
+    _BASE_W = ghost_render.CANVAS_W
+    _BASE_H = ghost_render.CANVAS_H
+
+    def __init__(self, config, monitor_filter=None, clock=None, rng=None,
+                 atlas=None, occlusion=None, bounds=None):
         super().__init__()
 
         self.config = config
-        self._scare_active = False
+        # One clock drives every animation and timed event
+        self._clock = clock or FrameClock(self.config.fps_active, self)
 
         # Single set of flags — never swap at runtime (XWayland leaks
         # native windows when setWindowFlags() recreates them).
@@ -189,558 +186,403 @@ class GhostPet(QWidget):
         # Widget size scales with ghost_scale
         s = self.config.ghost_scale
         self.setFixedSize(int(self._BASE_W * s), int(self._BASE_H * s))
+        self._scale = s
 
         # Where the ghost body is drawn within the widget (base coordinates)
-        self._ghost_ox = 70   # (220 - 80) / 2
-        self._ghost_oy = 90   # leave room for bubble + tail above
-
-        # Speech bubble state (drawn in same widget — no z-order issues)
-        self._bubble_msg = ""
-        self._bubble_active = False
-        self._bubble_width = 150
-
-        self._phrase_queue = []
-
-        self._bubble_timer = QTimer(self)
-        self._bubble_timer.timeout.connect(self._dismiss_bubble)
-
-        # Animation state
-        self._float_offset = 0
-        self._opacity = 1.0
-        # Random phase offsets for organic-feeling opacity waves
-        self._opacity_phases = [random.uniform(0, math.tau) for _ in range(3)]
-        self.direction = 1  # 1 = right, -1 = left
-        self.target_x = 0
-        self.target_y = 0
-        self.moving = False
-
-        # Eye animation state
-        self._blinking = False
-        self._blink_style = "closed"  # "closed" or "squint" (><)
-        self._sparkle_active = False
-        self._sparkle_start = 0
-
-        # Mouth animation state: "normal", "O", "happy"
-        self._mouth = "normal"
-        self._mouth_start = 0
-
-        # Get bounding box of screens (optionally filtered by manufacturer)
-        rects = []
-        for screen in QApplication.screens():
-            if monitor_filter and monitor_filter.lower() not in screen.manufacturer().lower():
-                continue
-            rects.append(screen.geometry())
-
-        if not rects:
-            # Fallback to primary screen
-            screen = QApplication.primaryScreen().geometry()
-            rects.append(screen)
-
-        self.bounds_x = min(r.x() for r in rects)
-        self.bounds_y = min(r.y() for r in rects)
-        self.bounds_right = max(r.x() + r.width() for r in rects)
-        self.bounds_bottom = max(r.y() + r.height() for r in rects)
-
-        # current_x/y = ghost body center on screen
-        self.current_x = (self.bounds_x + self.bounds_right) // 2
-        self.current_y = (self.bounds_y + self.bounds_bottom) // 2
+        self._ghost_ox = ghost_render.GHOST_OX
+        self._ghost_oy = ghost_render.GHOST_OY
+
+        # With a compositor, opacity is applied to the whole window
+        # (_NET_WM_WINDOW_OPACITY) so fades don't need a repaint.
+        self._compositor = _compositor_running()
+        self._window_opacity = 1.0
+
+        # Pre-rendered sprites, shared by every paintEvent (and ghost)
+        self._atlas = atlas or ghost_render.SpriteAtlas()
+
+        # While the window is fully covered, simulate but don't paint
+        self._occlusion = occlusion
+        self._occluded = False
+        if occlusion is not None:
+            occlusion.watch(self)
+
+        if bounds is None:
+            bounds = screen_bounds(screen_rects(monitor_filter))
+
+        # Simulation runs on the frame clock's time base
+        self.state = GhostState(config, bounds, rng=rng, clock=self._clock.now,
+                                measure=ghost_render.bubble_text.width)
+        self.state.listeners.append(self._on_state_event)
+        # Facing direction the window was last damaged for
+        self._direction = self.state.direction
+
+        self._widget_pos = None
         self._update_widget_pos()
 
-        # Timers
-        self.float_timer = QTimer(self)
-        self.float_timer.timeout.connect(self._update_float)
-        self.float_timer.start(50)
-
-        self.move_timer = QTimer(self)
-        self.move_timer.timeout.connect(self._update_position)
-        self.move_timer.start(30)
-
-        self.wander_timer = QTimer(self)
-        self.wander_timer.timeout.connect(self._pick_new_destination)
-        self.wander_timer.start(5000)
-
-        self.speak_timer = QTimer(self)
-        self.speak_timer.timeout.connect(self._say_random_phrase)
-        self.speak_timer.start(self.config.speak_interval * 1000)
-
-        # Scare timer — pop up on top periodically
-        self._scare_timer = QTimer(self)
-        self._scare_timer.setSingleShot(True)
-        self._scare_timer.timeout.connect(self._start_scare)
-        if self.config.scare_enabled:
-            self._schedule_next_scare()
-
-        # Blink timer — random blinks every 3-7 seconds
-        self._blink_timer = QTimer(self)
-        self._blink_timer.setSingleShot(True)
-        self._blink_timer.timeout.connect(self._start_blink)
-        self._schedule_next_blink()
-
-        # Sparkle timer — sparkly eyes every 20-40 seconds
-        self._sparkle_timer = QTimer(self)
-        self._sparkle_timer.setSingleShot(True)
-        self._sparkle_timer.timeout.connect(self._start_sparkle)
-        self._schedule_next_sparkle()
-
-        # Mouth animation timer — random expressions every 10-25 seconds
-        self._mouth_timer = QTimer(self)
-        self._mouth_timer.setSingleShot(True)
-        self._mouth_timer.timeout.connect(self._start_mouth)
-        self._schedule_next_mouth()
-
-        # Arms animation — little nubs poke out every 15-35 seconds
-        self._arms_active = False
-        self._arms_start = 0
-        self._arms_timer = QTimer(self)
-        self._arms_timer.setSingleShot(True)
-        self._arms_timer.timeout.connect(self._start_arms)
-        self._schedule_next_arms()
-
-        # Initial destination
-        self._pick_new_destination()
-
-        # Say hello!
-        QTimer.singleShot(1000, lambda: self._say_phrase("Boo! I'm your new friend!"))
+        # Widget area to repaint at the end of this tick
+        self._damage = QRegion()
+
+        # Wakeup for the state's next timed event between frames
+        self._wake = None
+        self._wake_due = None
+
+        # Per-frame animation: float, opacity, drift, scare fade
+        self._clock.add_frame_callback(self._on_frame)
+        # Compositors can come and go (e.g. toggled for games)
+        self._clock.call_every(10.0, self._check_compositor)
+
+        # Fill the sprite atlas once the event loop is running
+        self._clock.call_later(
+            0, lambda: self._atlas.warm(self._sprite_scale()))
+        # Sprites for a screen with another pixel ratio are a separate set
+        self._screen_hooked = False
+
+        self.state.step()
+        self._schedule_wake()
+        if clock is None:
+            self._clock.start()
 
     # ── config ────────────────────────────────────────────────────
 
     def apply_config(self):
         """Apply config changes live without restart."""
-        self.speak_timer.start(self.config.speak_interval * 1000)
-        self._phrase_queue = []
-
-        if not self.config.scare_enabled:
-            self._scare_timer.stop()
-        elif not self._scare_timer.isActive() and not self._scare_active:
-            self._schedule_next_scare()
+        self.state.apply_config()
+        self._schedule_wake()
 
         s = self.config.ghost_scale
-        self.setFixedSize(int(self._BASE_W * s), int(self._BASE_H * s))
+        if s != self._scale:
+            self._scale = s
+            self.setFixedSize(int(self._BASE_W * s), int(self._BASE_H * s))
+            # Sprites are keyed by scale; drop the ones nobody draws now
+            self._atlas.clear()
         self._update_widget_pos()
         self.update()
+        self._refresh_frame_rate()
 
-    # ── positioning ──────────────────────────────────────────────
-
-    def _update_widget_pos(self):
-        """Position widget so ghost body center aligns with current_x/y."""
-        s = self.config.ghost_scale
-        wx = int(self.current_x - (self._ghost_ox + 40) * s)
-        wy = int(self.current_y - (self._ghost_oy + 50) * s + self._float_offset)
-        self.move(wx, wy)
-
-    # ── speech bubble ────────────────────────────────────────────
+    def apply_power(self):
+        """Apply a new power profile: frame rate cap and antialiasing.
 
-    def _dismiss_bubble(self):
-        self._bubble_active = False
-        self._bubble_timer.stop()
+        Unlike apply_config, this leaves the simulation's timers and the
+        sprite atlas alone; the profile's effect on sparkles, arms and
+        scares applies from their next scheduled turn.
+        """
         self.update()
-
-    def _say_phrase(self, phrase):
-        self._bubble_msg = phrase
-        self._bubble_width = max(150, len(phrase) * 10 + 40)
-        self._bubble_active = True
-        self._bubble_timer.start(3000)
+        self._refresh_frame_rate()
+
+    # ── screens ──────────────────────────────────────────────────
+
+    def _sprite_scale(self):
+        """Atlas scale for this window: ghost_scale x its pixel ratio."""
+        return self.config.ghost_scale * self.devicePixelRatioF()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self._screen_hooked and self.windowHandle() is not None:
+            self._screen_hooked = True
+            self.windowHandle().screenChanged.connect(self._on_screen_changed)
+
+    def _on_screen_changed(self, screen):
+        # Wandering onto a screen with another pixel ratio (mixed-DPI
+        # setups) switches to that ratio's sprites; render them now
+        # rather than one at a time over the next frames
+        self._atlas.warm(self._sprite_scale())
+        self._damage_all()
+        self._flush_damage()
+
+    # ── opacity ──────────────────────────────────────────────────
+
+    def _update_window_opacity(self):
+        """Push the current opacity to the compositor."""
+        target = self.state.opacity
+        if self.state.bubble_active:
+            # Keep bubble readable even when ghost is faded
+            target = max(target, 0.6)
+        target = round(target * 255) / 255
+        if target != self._window_opacity:
+            self._window_opacity = target
+            self.setWindowOpacity(target)
+
+    def _paint_opacity(self, opacity):
+        """Painter opacity that yields opacity on screen."""
+        if not self._compositor:
+            return opacity
+        if self._window_opacity <= 0:
+            return 1.0
+        return min(1.0, opacity / self._window_opacity)
+
+    def _check_compositor(self):
+        running = _compositor_running()
+        if running == self._compositor:
+            return
+        self._compositor = running
+        if running:
+            self._update_window_opacity()
+        else:
+            self._window_opacity = 1.0
+            self.setWindowOpacity(1.0)
         self.update()
 
-    def _next_phrase(self):
-        phrases = self.config.custom_phrases or self.PHRASES
-        if not self._phrase_queue:
-            self._phrase_queue = random.sample(phrases, len(phrases))
-        return self._phrase_queue.pop()
+    # ── positioning ──────────────────────────────────────────────
+
+    def _update_widget_pos(self):
+        """Position widget so ghost body center aligns with current_x/y.
 
-    def _say_random_phrase(self):
-        if random.random() < self.config.speak_chance:
-            self._say_phrase(self._next_phrase())
+        Drift (current_x/y) and float offset are combined into one target;
+        move() is only issued when the integer position actually changes,
+        so the X server sees at most one ConfigureWindow per frame.
+        """
+        st = self.state
+        s = self.config.ghost_scale
+        wx = int(st.current_x - (self._ghost_ox + 40) * s)
+        wy = int(st.current_y - (self._ghost_oy + 50) * s + st.float_offset)
+        if (wx, wy) != self._widget_pos:
+            self._widget_pos = (wx, wy)
+            self.move(wx, wy)
 
     # ── animation ────────────────────────────────────────────────
 
-    def _update_float(self):
-        t = time.time()
-        self._float_offset = math.sin(t * 2) * 5
-
-        # Ghostly opacity — skip during scare (stay fully visible)
-        if not self._scare_active:
-            p = self._opacity_phases
-            sp = self.config.opacity_speed
-            wave = (math.sin(t * 0.3 * sp + p[0]) * 0.35 +
-                    math.sin(t * 0.7 * sp + p[1]) * 0.25 +
-                    math.sin(t * 1.1 * sp + p[2]) * 0.15)
-            self._opacity = max(self.config.opacity_min,
-                                min(self.config.opacity_max, 0.55 + wave))
+    def _on_frame(self, now, dt):
+        self._tick()
 
+    def _tick(self):
+        """Step the simulation to now and present the result."""
+        st = self.state
+        st.step()
+        # Motion integration: one combined move per frame
         self._update_widget_pos()
-        self.update()
-
-    def _pick_new_destination(self):
-        margin = 100
-        self.target_x = random.randint(self.bounds_x + margin,
-                                       self.bounds_right - margin)
-        self.target_y = random.randint(self.bounds_y + margin,
-                                       self.bounds_bottom - margin)
-        self.moving = True
-
-        if self.target_x > self.current_x:
-            self.direction = 1
+        occluded = self._is_occluded()
+        if occluded != self._occluded:
+            self._occluded = occluded
+            if not occluded:
+                # Nothing that changed while hidden was painted
+                self._damage_all()
+        if occluded:
+            self._damage = QRegion()
+        elif not self._compositor:
+            # Opacity is painted in, and it changes every frame
+            self._damage_all()
         else:
-            self.direction = -1
-
-    def _update_position(self):
-        if not self.moving:
+            self._update_window_opacity()
+            if st.bubble_active and st.opacity < 0.6:
+                # The body is painted relative to the bubble's opacity
+                self._damage_ghost(ghost_render.GHOST_RECT)
+            # Opacity alone no longer needs a repaint; while faded out,
+            # skip repainting the (barely visible) tail wave too.
+            elif not st.is_faded():
+                self._damage_animated()
+        self._flush_damage()
+        self._refresh_frame_rate()
+        self._schedule_wake()
+
+    # ── damage tracking ──────────────────────────────────────────
+
+    def _widget_rect(self, rect):
+        """Widget pixels covered by a canvas-coordinate rect."""
+        s = self.config.ghost_scale
+        area = QRectF(rect.x() * s, rect.y() * s,
+                      rect.width() * s, rect.height() * s)
+        # Antialiasing bleeds a pixel past the geometry
+        return area.toAlignedRect().adjusted(-1, -1, 1, 1)
+
+    def _damage_canvas(self, rect):
+        """Mark a canvas-coordinate rect for repaint."""
+        self._damage += self._widget_rect(rect)
+
+    def _damage_ghost(self, rect):
+        """Mark a ghost-box rect for repaint."""
+        self._damage_canvas(
+            ghost_render.canvas_rect(rect, self.state.direction))
+
+    def _damage_all(self):
+        self._damage_ghost(ghost_render.GHOST_RECT)
+        if self.state.bubble_active:
+            self._damage_canvas(ghost_render.BUBBLE_RECT)
+
+    def _damage_animated(self):
+        """Mark what moves every frame: tail, and any running effects."""
+        st = self.state
+        self._damage_ghost(ghost_render.TAIL_RECT)
+        if st.arms_active:
+            self._damage_ghost(ghost_render.ARMS_RECT)
+        if st.sparkle_active:
+            self._damage_ghost(ghost_render.FACE_RECT)
+        if st.mouth == "O":
+            self._damage_ghost(_SHAKE_RECT)
+
+    def _flush_damage(self):
+        if not self._damage.isEmpty():
+            self.update(self._damage)
+            self._damage = QRegion()
+
+    def _schedule_wake(self):
+        """Make sure the clock wakes up for the state's next event."""
+        due = self.state.next_event_due()
+        if due == self._wake_due and self._wake is not None and self._wake.active:
             return
-
-        speed = self.config.speed
-        dx = self.target_x - self.current_x
-        dy = self.target_y - self.current_y
-        distance = math.sqrt(dx * dx + dy * dy)
-
-        if distance < speed:
-            self.current_x = self.target_x
-            self.current_y = self.target_y
-            self.moving = False
-            # Immediately pick a new destination — keeps the ghost always drifting
-            self._pick_new_destination()
+        if self._wake is not None:
+            self._wake.cancel()
+        self._wake_due = due
+        self._wake = None
+        if due is not None:
+            self._wake = self._clock.call_later(
+                max(0.0, due - self.state.t), self._tick)
+
+    def _on_state_event(self, name, data):
+        if name == "scare":
+            # Pop to front of all windows
+            self.raise_()
+        elif name == "scare_end":
+            # Sink back behind windows
+            self.lower()
+        rect = _EVENT_DAMAGE.get(name)
+        if rect is not None:
+            self._damage_ghost(rect)
+        elif name in ("say", "bubble_end"):
+            self._damage_canvas(ghost_render.BUBBLE_RECT)
+            if self._compositor:
+                # The window opacity follows the bubble, and the body is
+                # painted relative to it
+                self._damage_ghost(ghost_render.GHOST_RECT)
+        elif name == "destination":
+            # Movement is handled by _update_widget_pos; only a new
+            # facing direction changes what is drawn
+            if self.state.direction != self._direction:
+                self._direction = self.state.direction
+                self._damage_ghost(ghost_render.GHOST_RECT)
         else:
-            self.current_x += (dx / distance) * speed
-            self.current_y += (dy / distance) * speed
-
-        self._update_widget_pos()
-
-    # ── eye animations ───────────────────────────────────────────
-
-    def _schedule_next_blink(self):
-        self._blink_timer.start(random.randint(3000, 7000))
-
-    def _start_blink(self):
-        self._blink_style = random.choice(["closed", "closed", "squint"])
-        self._blinking = True
-        self.update()
-        duration = 150 if self._blink_style == "closed" else 300
-        QTimer.singleShot(duration, self._end_blink)
-
-    def _end_blink(self):
-        self._blinking = False
-        self.update()
-        self._schedule_next_blink()
-
-    def _schedule_next_sparkle(self):
-        self._sparkle_timer.start(random.randint(20000, 40000))
-
-    def _start_sparkle(self):
-        self._sparkle_active = True
-        self._sparkle_start = time.time()
-        QTimer.singleShot(2000, self._end_sparkle)
-
-    def _end_sparkle(self):
-        self._sparkle_active = False
-        self.update()
-        self._schedule_next_sparkle()
-
-    def _schedule_next_mouth(self):
-        self._mouth_timer.start(random.randint(10000, 25000))
-
-    def _start_mouth(self):
-        self._mouth = random.choice(["O", "happy"])
-        self._mouth_start = time.time()
-        self.update()
-        duration = 1500 if self._mouth == "O" else 2000
-        QTimer.singleShot(duration, self._end_mouth)
-
-    def _end_mouth(self):
-        self._mouth = "normal"
-        self.update()
-        self._schedule_next_mouth()
-
-    # ── arms ─────────────────────────────────────────────────────
-
-    def _schedule_next_arms(self):
-        self._arms_timer.start(random.randint(15000, 35000))
-
-    def _start_arms(self):
-        self._arms_active = True
-        self._arms_start = time.time()
-        QTimer.singleShot(3000, self._end_arms)
-
-    def _end_arms(self):
-        self._arms_active = False
-        self.update()
-        self._schedule_next_arms()
+            # Scares: everything
+            self._damage_ghost(ghost_render.GHOST_RECT)
+            self._damage_canvas(ghost_render.BUBBLE_RECT)
+
+    def _refresh_frame_rate(self):
+        fps = self.state.frame_rate()
+        if self._occluded:
+            # Only the simulation runs; it doesn't need a smooth rate
+            fps = min(fps, self.config.fps_faded)
+        self._clock.request_fps(self, fps)
+
+    def _is_occluded(self):
+        if self.state.scare_active:
+            # Raised above everything for the duration
+            return False
+        handle = self.windowHandle()
+        if handle is not None and not handle.isExposed():
+            return True
+        return self._occlusion is not None and self._occlusion.covered(self)
 
     # ── scare ────────────────────────────────────────────────────
 
-    def _schedule_next_scare(self):
-        lo = self.config.scare_min_minutes * 60 * 1000
-        hi = self.config.scare_max_minutes * 60 * 1000
-        if lo > hi:
-            lo, hi = hi, lo
-        delay = random.randint(lo, hi)
-        self._scare_timer.start(delay)
-
-    def _start_scare(self):
-        """Called by scare timer — respects scare_enabled setting."""
-        if not self.config.scare_enabled:
-            self._schedule_next_scare()
-            return
-        self._do_scare()
-
     def _do_scare(self):
         """Execute a scare animation (always runs, even if scare is disabled)."""
-        self._scare_active = True
-        self._scare_start = time.time()
-        self._scare_duration = 5.0  # total seconds
-
-        # Pop to front of all windows
-        self.raise_()
-
-        # Start fully transparent then fade in
-        self._opacity = 0.0
-
-        # Say a scare phrase
-        scare_phrases = self.config.custom_scare_phrases or self.SCARE_PHRASES
-        phrase = random.choice(scare_phrases)
-        self._say_phrase(phrase)
-
-        # Tick the scare animation at 30fps
-        self._scare_tick_timer = QTimer(self)
-        self._scare_tick_timer.timeout.connect(self._scare_tick)
-        self._scare_tick_timer.start(33)
-
-    def _scare_tick(self):
-        elapsed = time.time() - self._scare_start
-        t = elapsed / self._scare_duration  # 0.0 → 1.0
-
-        if t >= 1.0:
-            # Done — fade complete, sink back behind windows
-            self._scare_tick_timer.stop()
-            self._scare_tick_timer.deleteLater()
-            self._scare_active = False
-            self._dismiss_bubble()
-            self.lower()
-            if self.config.scare_enabled:
-                self._schedule_next_scare()
-            return
-
-        # Fade curve: in for first 30%, hold for middle 40%, out for last 30%
-        if t < 0.3:
-            opacity = t / 0.3                 # 0 → 1
-        elif t < 0.7:
-            opacity = 1.0                      # hold at full
-        else:
-            opacity = 1.0 - (t - 0.7) / 0.3   # 1 → 0
-
-        self._opacity = opacity
+        self.state.scare()
+        self._tick()
 
     # ── drawing ──────────────────────────────────────────────────
 
     def paintEvent(self, event):
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-        painter.setOpacity(self._opacity)
+        painter.setRenderHint(QPainter.Antialiasing,
+                              self.config.power.antialias)
+        st = self.state
+        body_opacity = self._paint_opacity(st.opacity)
+        painter.setOpacity(body_opacity)
 
         s = self.config.ghost_scale
         painter.scale(s, s)
+        # Sprites rasterized for this screen's pixel ratio, drawn 1:1
+        r = self._sprite_scale()
+
+        # Only the damaged parts are repainted; skip what lies outside
+        region = event.region()
 
         # --- Speech bubble (drawn first, ghost overlaps slightly) ---
-        if self._bubble_active:
+        if st.bubble_active and region.intersects(
+                self._widget_rect(ghost_render.BUBBLE_RECT)):
             # Keep bubble readable even when ghost is faded
-            painter.setOpacity(max(self._opacity, 0.6))
-
-            bw = min(self._bubble_width, self._BASE_W - 10)
-            bh = 60
-            bx = (self._BASE_W - bw) // 2
-            by = 5
-
-            path = QPainterPath()
-            bubble_rect = QRect(bx + 5, by + 5, bw - 10, bh - 10)
-            path.addRoundedRect(bubble_rect.x(), bubble_rect.y(),
-                                bubble_rect.width(), bubble_rect.height(), 15, 15)
-
-            # Tail pointing down toward ghost
-            tail_x = self._BASE_W // 2
-            tail_top = by + bh
-            path.moveTo(tail_x - 10, tail_top - 5)
-            path.lineTo(tail_x, tail_top + 10)
-            path.lineTo(tail_x + 10, tail_top - 5)
-
-            painter.setBrush(QBrush(QColor(255, 255, 255, 240)))
-            painter.setPen(QPen(QColor(200, 200, 200), 2))
-            painter.drawPath(path)
-
-            painter.setPen(QColor(60, 60, 60))
-            painter.setFont(QFont("Sans", 10))
-            painter.drawText(bubble_rect, Qt.AlignCenter | Qt.TextWordWrap,
-                             self._bubble_msg)
-
+            painter.setOpacity(self._paint_opacity(max(st.opacity, 0.6)))
+            painter.drawPixmap(
+                ghost_render.BUBBLE_RECT.topLeft(),
+                self._atlas.bubble(st.bubble_msg, st.bubble_width, s,
+                                   self.devicePixelRatioF()))
             # Restore ghost opacity for body
-            painter.setOpacity(self._opacity)
+            painter.setOpacity(body_opacity)
 
         # --- Ghost body ---
-        painter.save()
+        now = st.t
         painter.translate(self._ghost_ox, self._ghost_oy)
 
-        cx = 40   # center within 80-wide ghost area
-        cy = 50
-
-        if self.direction == -1:
-            painter.translate(80, 0)
-            painter.scale(-1, 1)
-
-        # Ghost body path
-        path = QPainterPath()
-        path.moveTo(cx - 30, cy + 45)
-
-        path.quadTo(cx - 35, cy, cx - 30, cy - 25)
-        path.quadTo(cx - 25, cy - 40, cx, cy - 42)
-        path.quadTo(cx + 25, cy - 40, cx + 30, cy - 25)
-        path.quadTo(cx + 35, cy, cx + 30, cy + 45)
-
-        wave_y = cy + 45
-        wt = time.time() * 3  # wave animation speed
-        w0 = math.sin(wt) * 4
-        w1 = math.sin(wt + 1.5) * 4
-        w2 = math.sin(wt + 3.0) * 4
-        w3 = math.sin(wt + 4.5) * 4
-        path.quadTo(cx + 22, wave_y + 12 + w0, cx + 15, wave_y + w0)
-        path.quadTo(cx + 7, wave_y - 10 + w1, cx, wave_y + 5 + w1)
-        path.quadTo(cx - 7, wave_y + 15 + w2, cx - 15, wave_y + w2)
-        path.quadTo(cx - 22, wave_y - 8 + w3, cx - 30, wave_y + w3)
-
         # Arms (little rounded nubs that poke out from the sides)
-        if self._arms_active:
-            at = time.time() - self._arms_start
-            # Ease in 0.4s, hold 2.2s, ease out 0.4s
-            if at < 0.4:
-                t = at / 0.4
-            elif at < 2.6:
-                t = 1.0
-            else:
-                t = max(0.0, 1.0 - (at - 2.6) / 0.4)
-            extend = (1 - math.cos(t * math.pi)) / 2
-
-            arm_reach = 14 * extend
-            wiggle = math.sin(at * 4) * 2.5 * extend
-            arm_y = cy + 10
-
-            painter.setBrush(QBrush(QColor(255, 255, 255, 230)))
-            painter.setPen(QPen(QColor(180, 180, 200), 2))
-
-            # Left arm
-            lx = cx - 28 - arm_reach
-            ly = arm_y + wiggle
-            painter.drawEllipse(int(lx - 7), int(ly - 5), 14, 10)
-
-            # Right arm
-            rx = cx + 28 + arm_reach
-            ry = arm_y - wiggle
-            painter.drawEllipse(int(rx - 7), int(ry - 5), 14, 10)
-
-        # Shadow
-        painter.save()
-        painter.translate(2, 3)
-        painter.setBrush(QBrush(QColor(0, 0, 0, 40)))
-        painter.setPen(Qt.NoPen)
-        painter.drawPath(path)
-        painter.restore()
-
-        # Body
-        painter.setBrush(QBrush(QColor(255, 255, 255, 230)))
-        painter.setPen(QPen(QColor(180, 180, 200), 2))
-        painter.drawPath(path)
-
-        # Blush
-        painter.setBrush(QBrush(QColor(255, 180, 180, 100)))
-        painter.setPen(Qt.NoPen)
-        painter.drawEllipse(cx - 28, cy + 5, 12, 8)
-        painter.drawEllipse(cx + 16, cy + 5, 12, 8)
-
-        # Eyes
-        painter.setBrush(QBrush(QColor(40, 40, 40)))
-        if self._blinking and self._blink_style == "squint":
-            # (><) squint eyes
-            painter.setPen(QPen(QColor(40, 40, 40), 2.5))
-            painter.setBrush(Qt.NoBrush)
-            # Left eye: >
-            painter.drawLine(cx - 15, cy - 5, cx - 8, cy)
-            painter.drawLine(cx - 15, cy + 5, cx - 8, cy)
-            # Right eye: <
-            painter.drawLine(cx + 15, cy - 5, cx + 8, cy)
-            painter.drawLine(cx + 15, cy + 5, cx + 8, cy)
-            painter.setPen(Qt.NoPen)
-        elif self._blinking:
-            # Closed eyes — horizontal lines
-            painter.setPen(QPen(QColor(40, 40, 40), 2))
-            painter.drawLine(cx - 15, cy, cx - 5, cy)
-            painter.drawLine(cx + 5, cy, cx + 15, cy)
-            painter.setPen(Qt.NoPen)
-        else:
-            painter.drawEllipse(cx - 15, cy - 8, 10, 14)
-            painter.drawEllipse(cx + 5, cy - 8, 10, 14)
-
-            # Eye shine
-            painter.setBrush(QBrush(QColor(255, 255, 255)))
-            painter.drawEllipse(cx - 13, cy - 5, 4, 4)
-            painter.drawEllipse(cx + 7, cy - 5, 4, 4)
-
-            # Sparkle effect
-            if self._sparkle_active:
-                st = (time.time() - self._sparkle_start) * 4
-                painter.setPen(QPen(QColor(255, 255, 100), 1.5))
-                painter.setBrush(Qt.NoBrush)
-                for ex in (cx - 10, cx + 10):
-                    ey = cy - 1
-                    sz = 6 + math.sin(st) * 2
-                    # Four-point star
-                    star = QPainterPath()
-                    star.moveTo(ex, ey - sz)
-                    star.lineTo(ex + sz * 0.3, ey - sz * 0.3)
-                    star.lineTo(ex + sz, ey)
-                    star.lineTo(ex + sz * 0.3, ey + sz * 0.3)
-                    star.lineTo(ex, ey + sz)
-                    star.lineTo(ex - sz * 0.3, ey + sz * 0.3)
-                    star.lineTo(ex - sz, ey)
-                    star.lineTo(ex - sz * 0.3, ey - sz * 0.3)
-                    star.closeSubpath()
-                    painter.drawPath(star)
-                # Extra tiny sparkle dots
-                painter.setPen(Qt.NoPen)
-                painter.setBrush(QBrush(QColor(255, 255, 200)))
-                for i, (dx, dy) in enumerate([(-18, -10), (18, -12), (-14, 8), (16, 6)]):
-                    a = math.sin(st * 1.5 + i * 1.7)
-                    if a > 0:
-                        r = 1 + a * 1.5
-                        painter.drawEllipse(
-                            int(cx + dx - r), int(cy + dy - r),
-                            int(r * 2), int(r * 2))
-
-        # Mouth
-        if self._mouth == "O":
-            # Surprised "O" mouth with shake
-            mt = time.time() - self._mouth_start
-            shake_x = math.sin(mt * 25) * 1.5
-            shake_y = math.cos(mt * 30) * 1.0
-            painter.setPen(QPen(QColor(80, 80, 80), 2))
-            painter.setBrush(QBrush(QColor(220, 100, 100, 140)))
-            painter.drawEllipse(
-                int(cx - 4 + shake_x), int(cy + 13 + shake_y), 8, 10)
-        elif self._mouth == "happy":
-            # Big happy grin — D rotated 90° clockwise (flat top, round bottom)
-            painter.setPen(QPen(QColor(80, 80, 80), 2))
-            painter.setBrush(QBrush(QColor(220, 100, 100, 140)))
-            grin = QPainterPath()
-            grin.moveTo(cx - 6, cy + 15)
-            grin.lineTo(cx + 6, cy + 15)
-            grin.quadTo(cx + 8, cy + 22, cx, cy + 24)
-            grin.quadTo(cx - 8, cy + 22, cx - 6, cy + 15)
-            painter.drawPath(grin)
-        else:
-            # Normal small smile
-            painter.setPen(QPen(QColor(80, 80, 80), 2))
-            painter.setBrush(Qt.NoBrush)
-            mouth = QPainterPath()
-            mouth.moveTo(cx - 5, cy + 15)
-            mouth.quadTo(cx, cy + 20, cx + 5, cy + 15)
-            painter.drawPath(mouth)
+        if st.arms_active and region.intersects(self._widget_rect(
+                ghost_render.canvas_rect(ghost_render.ARMS_RECT, 1))):
+            painter.save()
+            if st.direction == -1:
+                painter.translate(ghost_render.GHOST_W, 0)
+                painter.scale(-1, 1)
+            ghost_render.draw_arms(painter, now - st.arms_start)
+            painter.restore()
+
+        # Body in two layers: static top, and the tail strip that waves
+        body_rect = ghost_render.sprite_rect(ghost_render.BODY_RECT, r)
+        painter.drawPixmap(body_rect.topLeft(),
+                           self._atlas.body_top(st.direction, r))
+        painter.drawPixmap(
+            QPointF(body_rect.x(), self._atlas.tail_top(r)),
+            self._atlas.tail(ghost_render.tail_frame(now * 3),
+                             st.direction, r))
+
+        # Face and mouth come pre-rendered (and pre-mirrored) from the atlas
+        eyes, sparkle = ghost_render.face_key(st)
+        painter.drawPixmap(
+            ghost_render.sprite_rect(ghost_render.FACE_RECT, r).topLeft(),
+            self._atlas.face(eyes, sparkle, st.direction, r))
+
+        # Surprised "O" mouth shakes, in whole device pixels
+        mx, my = ghost_render.mouth_shake(st)
+        mouth_rect = ghost_render.sprite_rect(ghost_render.MOUTH_RECT, r)
+        painter.drawPixmap(
+            QPointF(mouth_rect.x() + round(mx * r) / r,
+                    mouth_rect.y() + round(my * r) / r),
+            self._atlas.mouth(st.mouth, st.direction, r))
+
+
+def _measure_phrases(clock, phrases, chunk=8):
+    """Lay out every phrase a few at a time, off the startup path."""
+    pending = list(phrases)
+
+    def measure():
+        for phrase in pending[:chunk]:
+            ghost_render.bubble_text.layout(phrase)
+        del pending[:chunk]
+        if pending:
+            clock.call_later(0.05, measure)
+
+    clock.call_later(1.0, measure)
+
+
+class _GhostGroup:
+    """Fans tray and settings actions out to several ghost windows."""
+
+    def __init__(self, ghosts, clock):
+        self.ghosts = ghosts
+        self._grid = separation.SpatialHash(separation.RADIUS)
+        clock.add_frame_callback(self._separate)
+
+    def _separate(self, now, dt):
+        """Steer the ghosts apart; they pick the push up on their next tick."""
+        states = [g.state for g in self.ghosts]
+        separation.apply(states, self.ghosts[0].config, self._grid)
+
+    def apply_config(self):
+        for g in self.ghosts:
+            g.apply_config()
 
-        painter.restore()
+    def apply_power(self):
+        for g in self.ghosts:
+            g.apply_power()
+
+    def _do_scare(self):
+        for g in self.ghosts:
+            g._do_scare()
 
 
 def _create_tray_icon():
@@ -788,14 +630,149 @@ def main():
         help="only use monitors matching this manufacturer substring "
              "(e.g. --monitors Samsung). Default: all monitors.",
     )
+    parser.add_argument(
+        "--count", type=int, default=1, metavar="N",
+        help="number of ghosts (default: 1)",
+    )
+    parser.add_argument(
+        "--overlay", action="store_true",
+        help="draw all ghosts in one transparent overlay per screen "
+             "instead of one window per ghost (cheaper for large --count)",
+    )
+    parser.add_argument(
+        "--swarm", action="store_true",
+        help="like --overlay, but simulate the ghosts with NumPy arrays "
+             "(for hundreds of ghosts; no speech bubbles; needs NumPy)",
+    )
+    parser.add_argument(
+        "--stats", action="store_true",
+        help="profile frame times and show them next to the ghost; "
+             "the tray menu can dump them to JSON",
+    )
+    parser.add_argument(
+        "--record", metavar="FILE",
+        help="write the session to a trace file for benchmark.py --replay "
+             "(single ghost only)",
+    )
+    parser.add_argument(
+        "--seed", type=int, metavar="N",
+        help="random seed for the ghost's behavior (default: random)",
+    )
+    parser.add_argument(
+        "--export-animation", metavar="OUT",
+        help="render a session to an animated .gif, .png (APNG) or .webp "
+             "(needs Pillow), or to PNG frames in a directory, and exit",
+    )
+    parser.add_argument(
+        "--trace", metavar="FILE",
+        help="session for --export-animation, recorded with --record "
+             "(default: a seeded session with a greeting and a scare)",
+    )
+    parser.add_argument(
+        "--start", type=float, default=0.0, metavar="SECONDS",
+        help="--export-animation start time (default: 0)",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=10.0, metavar="SECONDS",
+        help="--export-animation length (default: 10)",
+    )
+    parser.add_argument(
+        "--export-fps", type=float, metavar="N",
+        help="--export-animation frame rate (default: 60; 50 for GIF, "
+             "which can't go faster and needs 100/N to be whole)",
+    )
     args, remaining = parser.parse_known_args()
+    if args.record and (args.count != 1 or args.overlay or args.swarm):
+        parser.error("--record works with a single ghost window only")
+    seed = args.seed if args.seed is not None else random.randrange(2**32)
+
+    if args.export_animation:
+        import ghost_export
+        import ghost_trace
+        if args.duration <= 0 or (args.export_fps is not None
+                                  and args.export_fps <= 0):
+            parser.error("--duration and --export-fps must be positive")
+        if args.trace:
+            trace = ghost_trace.load(args.trace)
+        else:
+            trace = ghost_export.scripted_trace(Config(), seed)
+        try:
+            fps = ghost_export.frame_rate(args.export_animation,
+                                          args.export_fps)
+            if args.export_fps is not None and fps != args.export_fps:
+                print(f"GIF frame delays are whole centiseconds: "
+                      f"exporting at {fps:g} fps", file=sys.stderr)
+            count = ghost_export.export_animation(
+                args.export_animation, trace, args.start, args.duration,
+                args.export_fps)
+        except (ValueError, RuntimeError) as e:
+            parser.error(str(e))
+        print(f"Wrote {count} frames to {args.export_animation}")
+        return
 
     app = QApplication(remaining)
     app.setQuitOnLastWindowClosed(False)
 
     config = Config()
-    ghost = GhostPet(config=config, monitor_filter=args.monitors)
-    ghost.show()
+    # All ghosts share one frame clock and one sprite atlas
+    clock = FrameClock(config.fps_active, app)
+    atlas = ghost_render.SpriteAtlas()
+    # Lighter animation on battery; settings can pin a profile instead.
+    # Created first: its initial reading sets config.auto_profile, which
+    # the ghosts (and a --record trace header) must start out with
+    power_monitor = power.PowerMonitor(config, clock, parent=app)
+    if args.swarm:
+        try:
+            from swarm import SwarmFlock
+        except ImportError as e:
+            parser.error(f"--swarm needs NumPy ({e})")
+        flock = SwarmFlock(config, max(1, args.count),
+                           screen_rects(args.monitors), clock, atlas, seed)
+        flock.show()
+        ghost = flock
+    elif args.overlay:
+        from ghost_overlay import GhostFlock
+        flock = GhostFlock(config, max(1, args.count),
+                           screen_rects(args.monitors), clock, atlas,
+                           random.Random(seed))
+        flock.show()
+        ghost = flock
+    else:
+        occlusion = OcclusionMonitor(clock, parent=app)
+        ghosts = []
+        for i in range(max(1, args.count)):
+            g = GhostPet(config=config, monitor_filter=args.monitors,
+                         clock=clock, atlas=atlas, occlusion=occlusion,
+                         rng=random.Random(seed + i))
+            g.show()
+            ghosts.append(g)
+        ghost = ghosts[0] if len(ghosts) == 1 else _GhostGroup(ghosts, clock)
+    if args.record:
+        from ghost_trace import TraceRecorder
+        recorder = TraceRecorder(ghost, args.record, seed)
+        app.aboutToQuit.connect(recorder.close)
+    _measure_phrases(clock, GhostState.all_phrases(config))
+    clock.start()
+
+    profiler = None
+    if args.stats:
+        from stats import Profiler, StatsHud
+        profiler = Profiler(clock, app)
+        profiler.instrument(ghost)
+        if hasattr(ghost, "overlays"):
+            anchor = ghost.overlays[0]
+        else:
+            anchor = getattr(ghost, "ghosts", [ghost])[0]
+        hud = StatsHud(profiler, anchor)
+        hud.show()
+
+    power_monitor.changed.connect(lambda name: ghost.apply_power())
+
+    # Nobody to haunt while the screen is locked, blanked or off: freeze
+    # all animation and timers, and pick up where they left off after
+    idle = IdleMonitor(parent=app)
+    idle.suspendedChanged.connect(
+        lambda suspended: clock.pause() if suspended else clock.resume())
 
     # System tray icon
     tray = QSystemTrayIcon(_create_tray_icon(), app)
@@ -804,6 +781,10 @@ def main():
     menu = QMenu()
     settings_action = menu.addAction("Settings")
     scare_action = menu.addAction("Scare now!")
+    if profiler is not None:
+        dump_action = menu.addAction("Dump stats")
+        dump_action.triggered.connect(lambda: tray.showMessage(
+            "Ghost Pet", f"Stats written to {profiler.dump()}"))
     menu.addSeparator()
     quit_action = menu.addAction("Quit")
 
@@ -0,0 +1,728 @@
+"""Drawing primitives and render caches for Ghost Pet.
+
+Ghost drawing functions work in the ghost's base coordinate space: an
+80x100 box whose body center sits at (CX, CY), before ghost_scale and
+direction mirroring are applied by the caller. The speech bubble is
+drawn in canvas coordinates: the 220x210 area of a GhostPet window,
+with the ghost box at (GHOST_OX, GHOST_OY).
+"""
+
+import math
+from collections import OrderedDict
+
+from PyQt5.QtCore import Qt, QRect, QRectF, QPointF
+from PyQt5.QtGui import (
+    QPainter, QColor, QPainterPath, QFont, QFontMetricsF, QBrush, QPen,
+    QPixmap,
+)
+
+# Canvas (one ghost plus its bubble) and the ghost box within it
+CANVAS_W = 220
+CANVAS_H = 210
+GHOST_OX = 70   # (220 - 80) / 2
+GHOST_OY = 90   # leave room for bubble + tail above
+
+# Body center within the 80-wide ghost area
+CX = 40
+CY = 50
+GHOST_W = 80
+
+# Sprite regions in ghost coordinates. Both are symmetric around CX so
+# the same rect works for either facing direction.
+FACE_RECT = QRect(8, 32, 64, 36)
+MOUTH_RECT = QRect(28, 60, 24, 18)
+# Body outline including pen width and drop shadow
+BODY_RECT = QRect(0, 4, 80, 118)
+# Areas that animate on their own (ghost box coordinates, facing right):
+# the tail wave with its shadow, and the arm nubs at full reach + wiggle
+TAIL_RECT = QRect(8, 78, 68, 42)
+ARMS_RECT = QRect(-10, 51, 100, 18)
+# Everything a ghost draws outside its bubble
+GHOST_RECT = QRect(-10, 4, 100, 120)
+# Speech bubble (tail and outline included) in canvas coordinates
+BUBBLE_RECT = QRect(0, 0, CANVAS_W, 80)
+BUBBLE_MAX_W = CANVAS_W - 10
+
+# Sparkle animation repeats every 4*pi of its phase (lcm of sin(st) and
+# sin(st * 1.5)); quantize that period into this many atlas frames.
+SPARKLE_FRAMES = 24
+SPARKLE_PERIOD = 4 * math.pi
+
+# Tail wave phase (sin(wt + k)) quantized for pre-rendered body sprites
+TAIL_FRAMES = 32
+
+# Shared paint resources — built once instead of on every frame
+_SHADOW_BRUSH = QBrush(QColor(0, 0, 0, 40))
+_BODY_BRUSH = QBrush(QColor(255, 255, 255, 230))
+_BODY_PEN = QPen(QColor(180, 180, 200), 2)
+_BLUSH_BRUSH = QBrush(QColor(255, 180, 180, 100))
+_EYE_COLOR = QColor(40, 40, 40)
+_EYE_BRUSH = QBrush(_EYE_COLOR)
+_SQUINT_PEN = QPen(_EYE_COLOR, 2.5)
+_CLOSED_PEN = QPen(_EYE_COLOR, 2)
+_SHINE_BRUSH = QBrush(QColor(255, 255, 255))
+_STAR_PEN = QPen(QColor(255, 255, 100), 1.5)
+_DOT_BRUSH = QBrush(QColor(255, 255, 200))
+_MOUTH_PEN = QPen(QColor(80, 80, 80), 2)
+_MOUTH_BRUSH = QBrush(QColor(220, 100, 100, 140))
+_BUBBLE_BRUSH = QBrush(QColor(255, 255, 255, 240))
+_BUBBLE_PEN = QPen(QColor(200, 200, 200), 2)
+_TEXT_COLOR = QColor(60, 60, 60)
+
+
+# ── primitives ───────────────────────────────────────────────────
+
+def _body_template():
+    """The head and sides of the outline, which never change."""
+    cx, cy = CX, CY
+    path = QPainterPath()
+    path.moveTo(cx - 30, cy + 45)
+
+    path.quadTo(cx - 35, cy, cx - 30, cy - 25)
+    path.quadTo(cx - 25, cy - 40, cx, cy - 42)
+    path.quadTo(cx + 25, cy - 40, cx + 30, cy - 25)
+    path.quadTo(cx + 35, cy, cx + 30, cy + 45)
+    return path
+
+
+_BODY_TEMPLATE = None
+# Body outlines at each quantized tail phase; built on first use, then
+# shared by every scale, direction and atlas
+_TAIL_PATHS = [None] * TAIL_FRAMES
+
+
+def body_path(wt):
+    """Build the body outline for tail-wave phase wt."""
+    global _BODY_TEMPLATE
+    if _BODY_TEMPLATE is None:
+        _BODY_TEMPLATE = _body_template()
+    cx, cy = CX, CY
+    # Copy-on-write: only the tail elements appended below are new
+    path = QPainterPath(_BODY_TEMPLATE)
+
+    wave_y = cy + 45
+    w0 = math.sin(wt) * 4
+    w1 = math.sin(wt + 1.5) * 4
+    w2 = math.sin(wt + 3.0) * 4
+    w3 = math.sin(wt + 4.5) * 4
+    path.quadTo(cx + 22, wave_y + 12 + w0, cx + 15, wave_y + w0)
+    path.quadTo(cx + 7, wave_y - 10 + w1, cx, wave_y + 5 + w1)
+    path.quadTo(cx - 7, wave_y + 15 + w2, cx - 15, wave_y + w2)
+    path.quadTo(cx - 22, wave_y - 8 + w3, cx - 30, wave_y + w3)
+    return path
+
+
+def tail_path(tail):
+    """Body outline at quantized tail phase tail, from the shared pool."""
+    path = _TAIL_PATHS[tail]
+    if path is None:
+        path = _TAIL_PATHS[tail] = body_path(
+            (tail + 0.5) * math.tau / TAIL_FRAMES)
+    return path
+
+
+def draw_body(painter, path):
+    """Draw the drop shadow and then the body fill/outline."""
+    painter.save()
+    painter.translate(2, 3)
+    painter.setBrush(_SHADOW_BRUSH)
+    painter.setPen(Qt.NoPen)
+    painter.drawPath(path)
+    painter.restore()
+
+    painter.setBrush(_BODY_BRUSH)
+    painter.setPen(_BODY_PEN)
+    painter.drawPath(path)
+
+
+def draw_arms(painter, at):
+    """Draw the arm nubs, at seconds since they started poking out."""
+    cx, cy = CX, CY
+    # Ease in 0.4s, hold 2.2s, ease out 0.4s
+    if at < 0.4:
+        t = at / 0.4
+    elif at < 2.6:
+        t = 1.0
+    else:
+        t = max(0.0, 1.0 - (at - 2.6) / 0.4)
+    extend = (1 - math.cos(t * math.pi)) / 2
+
+    arm_reach = 14 * extend
+    wiggle = math.sin(at * 4) * 2.5 * extend
+    arm_y = cy + 10
+
+    painter.setBrush(_BODY_BRUSH)
+    painter.setPen(_BODY_PEN)
+
+    # Left arm
+    lx = cx - 28 - arm_reach
+    ly = arm_y + wiggle
+    painter.drawEllipse(int(lx - 7), int(ly - 5), 14, 10)
+
+    # Right arm
+    rx = cx + 28 + arm_reach
+    ry = arm_y - wiggle
+    painter.drawEllipse(int(rx - 7), int(ry - 5), 14, 10)
+
+
+def draw_face(painter, eyes, sparkle_st=None):
+    """Draw blush and eyes.
+
+    eyes is "open", "closed" or "squint"; sparkle_st is the sparkle
+    phase, or None when the eyes aren't sparkling.
+    """
+    cx, cy = CX, CY
+
+    # Blush
+    painter.setBrush(_BLUSH_BRUSH)
+    painter.setPen(Qt.NoPen)
+    painter.drawEllipse(cx - 28, cy + 5, 12, 8)
+    painter.drawEllipse(cx + 16, cy + 5, 12, 8)
+
+    # Eyes
+    painter.setBrush(_EYE_BRUSH)
+    if eyes == "squint":
+        # (><) squint eyes
+        painter.setPen(_SQUINT_PEN)
+        painter.setBrush(Qt.NoBrush)
+        # Left eye: >
+        painter.drawLine(cx - 15, cy - 5, cx - 8, cy)
+        painter.drawLine(cx - 15, cy + 5, cx - 8, cy)
+        # Right eye: <
+        painter.drawLine(cx + 15, cy - 5, cx + 8, cy)
+        painter.drawLine(cx + 15, cy + 5, cx + 8, cy)
+        painter.setPen(Qt.NoPen)
+        return
+    if eyes == "closed":
+        # Closed eyes — horizontal lines
+        painter.setPen(_CLOSED_PEN)
+        painter.drawLine(cx - 15, cy, cx - 5, cy)
+        painter.drawLine(cx + 5, cy, cx + 15, cy)
+        painter.setPen(Qt.NoPen)
+        return
+
+    painter.drawEllipse(cx - 15, cy - 8, 10, 14)
+    painter.drawEllipse(cx + 5, cy - 8, 10, 14)
+
+    # Eye shine
+    painter.setBrush(_SHINE_BRUSH)
+    painter.drawEllipse(cx - 13, cy - 5, 4, 4)
+    painter.drawEllipse(cx + 7, cy - 5, 4, 4)
+
+    if sparkle_st is None:
+        return
+
+    # Sparkle effect
+    st = sparkle_st
+    painter.setPen(_STAR_PEN)
+    painter.setBrush(Qt.NoBrush)
+    for ex in (cx - 10, cx + 10):
+        ey = cy - 1
+        sz = 6 + math.sin(st) * 2
+        # Four-point star
+        star = QPainterPath()
+        star.moveTo(ex, ey - sz)
+        star.lineTo(ex + sz * 0.3, ey - sz * 0.3)
+        star.lineTo(ex + sz, ey)
+        star.lineTo(ex + sz * 0.3, ey + sz * 0.3)
+        star.lineTo(ex, ey + sz)
+        star.lineTo(ex - sz * 0.3, ey + sz * 0.3)
+        star.lineTo(ex - sz, ey)
+        star.lineTo(ex - sz * 0.3, ey - sz * 0.3)
+        star.closeSubpath()
+        painter.drawPath(star)
+    # Extra tiny sparkle dots
+    painter.setPen(Qt.NoPen)
+    painter.setBrush(_DOT_BRUSH)
+    for i, (dx, dy) in enumerate([(-18, -10), (18, -12), (-14, 8), (16, 6)]):
+        a = math.sin(st * 1.5 + i * 1.7)
+        if a > 0:
+            r = 1 + a * 1.5
+            painter.drawEllipse(
+                int(cx + dx - r), int(cy + dy - r),
+                int(r * 2), int(r * 2))
+
+
+def draw_mouth(painter, mouth):
+    """Draw the mouth ("normal", "O" or "happy") at rest position."""
+    cx, cy = CX, CY
+    painter.setPen(_MOUTH_PEN)
+    if mouth == "O":
+        # Surprised "O" mouth
+        painter.setBrush(_MOUTH_BRUSH)
+        painter.drawEllipse(cx - 4, cy + 13, 8, 10)
+    elif mouth == "happy":
+        # Big happy grin — D rotated 90° clockwise (flat top, round bottom)
+        painter.setBrush(_MOUTH_BRUSH)
+        grin = QPainterPath()
+        grin.moveTo(cx - 6, cy + 15)
+        grin.lineTo(cx + 6, cy + 15)
+        grin.quadTo(cx + 8, cy + 22, cx, cy + 24)
+        grin.quadTo(cx - 8, cy + 22, cx - 6, cy + 15)
+        painter.drawPath(grin)
+    else:
+        # Normal small smile
+        painter.setBrush(Qt.NoBrush)
+        mouth_path = QPainterPath()
+        mouth_path.moveTo(cx - 5, cy + 15)
+        mouth_path.quadTo(cx, cy + 20, cx + 5, cy + 15)
+        painter.drawPath(mouth_path)
+
+
+def draw_bubble(painter, msg, width):
+    """Draw the speech bubble in canvas coordinates."""
+    bw = min(width, BUBBLE_MAX_W)
+    bh = 60
+    bx = (CANVAS_W - bw) // 2
+    by = 5
+
+    path = QPainterPath()
+    bubble_rect = QRect(bx + 5, by + 5, bw - 10, bh - 10)
+    path.addRoundedRect(bubble_rect.x(), bubble_rect.y(),
+                        bubble_rect.width(), bubble_rect.height(), 15, 15)
+
+    # Tail pointing down toward ghost
+    tail_x = CANVAS_W // 2
+    tail_top = by + bh
+    path.moveTo(tail_x - 10, tail_top - 5)
+    path.lineTo(tail_x, tail_top + 10)
+    path.lineTo(tail_x + 10, tail_top - 5)
+
+    painter.setBrush(_BUBBLE_BRUSH)
+    painter.setPen(_BUBBLE_PEN)
+    painter.drawPath(path)
+
+    # Line breaks come from bubble_text; word wrap only kicks in if the
+    # caller picked a narrower width than the layout asked for
+    painter.setPen(_TEXT_COLOR)
+    painter.setFont(bubble_text.font())
+    painter.drawText(bubble_rect, Qt.AlignCenter | Qt.TextWordWrap,
+                     bubble_text.layout(msg)[1])
+
+
+class BubbleText:
+    """Bubble text laid out with real font metrics, memoized per phrase.
+
+    layout(msg) greedily word-wraps msg to the widest line a bubble can
+    hold and returns the bubble width that fits the result snugly along
+    with the text with its line breaks. The font (and its metrics) is
+    created on first use, as QFont needs a QGuiApplication.
+    """
+
+    # Room between the text and the bubble's outer edge, per side:
+    # 5 px of margin around the rounded rect plus 10 px of padding
+    PAD = 15
+    MIN_W = 70
+
+    def __init__(self, family="Sans", size=10):
+        self.family = family
+        self.size = size
+        self._font = None
+        self._metrics = None
+        self._layouts = {}
+
+    def font(self):
+        if self._font is None:
+            self._font = QFont(self.family, self.size)
+            self._metrics = QFontMetricsF(self._font)
+        return self._font
+
+    def width(self, msg):
+        """Bubble width for msg."""
+        return self.layout(msg)[0]
+
+    def layout(self, msg):
+        """(bubble width, text with line breaks) for msg."""
+        key = (self.family, self.size, msg)
+        result = self._layouts.get(key)
+        if result is None:
+            result = self._layouts[key] = self._layout(msg)
+        return result
+
+    def _layout(self, msg):
+        self.font()
+        advance = self._metrics.horizontalAdvance
+        words = [(w, advance(w)) for w in msg.split()]
+        space = advance(" ")
+        max_w = BUBBLE_MAX_W - 2 * self.PAD
+        lines = self._wrap(words, space, max_w)
+        if len(lines) > 1:
+            # Balance the lines: narrowest width giving no more lines
+            lo, hi = max(w for _, w in words), max_w
+            while hi - lo > 1:
+                mid = (lo + hi) / 2
+                if len(self._wrap(words, space, mid)) <= len(lines):
+                    hi = mid
+                else:
+                    lo = mid
+            lines = self._wrap(words, space, hi)
+        text_w = max((w for _, w in lines), default=0.0)
+        bw = min(BUBBLE_MAX_W, max(self.MIN_W,
+                                   math.ceil(text_w) + 2 * self.PAD))
+        return bw, "\n".join(text for text, _ in lines)
+
+    @staticmethod
+    def _wrap(words, space, max_w):
+        """Greedy word wrap of (word, advance) pairs into (line, width)."""
+        lines = []
+        line, line_w = [], 0.0
+        for word, w in words:
+            if line and line_w + space + w > max_w:
+                lines.append((" ".join(line), line_w))
+                line, line_w = [], 0.0
+            line_w += (space if line else 0.0) + w
+            line.append(word)
+        if line:
+            lines.append((" ".join(line), line_w))
+        return lines
+
+
+# Shared by every ghost: phrases are laid out once per process
+bubble_text = BubbleText()
+
+
+def canvas_rect(rect, direction):
+    """Canvas rect covered by a ghost-box rect, mirrored for direction."""
+    x = rect.x() if direction == 1 else GHOST_W - rect.x() - rect.width()
+    return QRect(GHOST_OX + x, GHOST_OY + rect.y(), rect.width(), rect.height())
+
+
+def _device_box(rect, scale):
+    """Device pixels (x0, y0, x1, y1) a ghost-box rect covers on a canvas
+    drawn at raster scale."""
+    # The epsilon keeps float noise from pushing exact edges outward
+    return (math.floor((GHOST_OX + rect.x()) * scale + 1e-6),
+            math.floor((GHOST_OY + rect.y()) * scale + 1e-6),
+            math.ceil((GHOST_OX + rect.x() + rect.width()) * scale - 1e-6),
+            math.ceil((GHOST_OY + rect.y() + rect.height()) * scale - 1e-6))
+
+
+def sprite_rect(rect, scale):
+    """Ghost-box area of the sprite for rect at raster scale.
+
+    rect grown out to whole device pixels of the canvas, so the sprite
+    drawn at this rect lands 1:1 on device pixels at any scale.
+    """
+    x0, y0, x1, y1 = _device_box(rect, scale)
+    return QRectF(x0 / scale - GHOST_OX, y0 / scale - GHOST_OY,
+                  (x1 - x0) / scale, (y1 - y0) / scale)
+
+
+def sparkle_frame(st):
+    """Quantize a sparkle phase to an atlas frame index."""
+    return int(st / SPARKLE_PERIOD * SPARKLE_FRAMES) % SPARKLE_FRAMES
+
+
+def tail_frame(wt):
+    """Quantize a tail-wave phase to an atlas frame index."""
+    return int(wt / math.tau * TAIL_FRAMES) % TAIL_FRAMES
+
+
+def face_key(st):
+    """(eyes, sparkle frame) for a GhostState's current expression."""
+    if st.blinking:
+        return st.blink_style, None
+    if st.sparkle_active:
+        return "open", sparkle_frame((st.t - st.sparkle_start) * 4)
+    return "open", None
+
+
+def mouth_shake(st):
+    """Offset of the shaking "O" mouth, already mirrored for direction."""
+    if st.mouth != "O":
+        return 0.0, 0.0
+    mt = st.t - st.mouth_start
+    return math.sin(mt * 25) * 1.5 * st.direction, math.cos(mt * 30) * 1.0
+
+
+# ── sprite atlas ─────────────────────────────────────────────────
+
+class SpriteAtlas:
+    """Pre-rendered ghost sprites.
+
+    The face (blush + eyes) and mouth only come in a handful of
+    discrete states, and the body in TAIL_FRAMES tail phases, so they're
+    rasterized once per (state, direction, scale) and blitted with
+    drawPixmap afterwards.
+
+    scale is the raster scale: ghost_scale times the device pixel ratio
+    of the screen drawn on, so each (ghost_scale x ratio) bucket gets
+    its own crisp sprites, and a window moving to a screen with another
+    ratio switches buckets instead of stretching. Sprites carry
+    devicePixelRatio == scale, so they map 1:1 onto device pixels when
+    drawn at sprite_rect(rect, scale) through a painter already scaled
+    by ghost_scale. Each sprite covers whole device pixels of the
+    canvas and holds the vector drawing at its exact sub-pixel position,
+    so scales off the half-pixel grid (0.7, 1.3, ...) match the vector
+    drawing too.
+    """
+
+    EYES = ("open", "closed", "squint")
+    MOUTHS = ("normal", "O", "happy")
+
+    def __init__(self):
+        self._sprites = {}
+        self.bubbles = BubbleCache()
+
+    def clear(self):
+        self._sprites.clear()
+        self.bubbles.clear()
+
+    def bubble(self, msg, width, scale, dpr=1.0):
+        return self.bubbles.get(msg, width, scale, dpr)
+
+    def face(self, eyes, sparkle, direction, scale):
+        """Face sprite; sparkle is a frame index or None."""
+        key = ("face", eyes, sparkle, direction, scale)
+        pix = self._sprites.get(key)
+        if pix is None:
+            st = None
+            if sparkle is not None:
+                st = (sparkle + 0.5) * SPARKLE_PERIOD / SPARKLE_FRAMES
+            pix = self._render(FACE_RECT, direction, scale,
+                               lambda p: draw_face(p, eyes, st))
+            self._sprites[key] = pix
+        return pix
+
+    def mouth(self, mouth, direction, scale):
+        key = ("mouth", mouth, direction, scale)
+        pix = self._sprites.get(key)
+        if pix is None:
+            pix = self._render(MOUTH_RECT, direction, scale,
+                               lambda p: draw_mouth(p, mouth))
+            self._sprites[key] = pix
+        return pix
+
+    def body(self, tail, direction, scale):
+        """Body + shadow sprite at quantized tail phase tail."""
+        key = ("body", tail, direction, scale)
+        pix = self._sprites.get(key)
+        if pix is None:
+            pix = self._sprites[key] = self._render_body(tail, direction, scale)
+        return pix
+
+    # The body in two layers: everything above the tail strip is the same
+    # for every tail phase, so only the strip below it changes per frame.
+    # The split falls on a device pixel row so the layers meet seamlessly.
+
+    @staticmethod
+    def _split_row(scale):
+        """Canvas device row where the tail strip starts."""
+        return round((GHOST_OY + TAIL_RECT.top()) * scale)
+
+    @classmethod
+    def tail_split(cls, scale):
+        """Device rows of the body sprite that belong to the static layer."""
+        return cls._split_row(scale) - _device_box(BODY_RECT, scale)[1]
+
+    @classmethod
+    def tail_top(cls, scale):
+        """Ghost-box y where the tail strip starts."""
+        return cls._split_row(scale) / scale - GHOST_OY
+
+    def body_top(self, direction, scale):
+        """Static body + shadow layer above the tail strip."""
+        key = ("body_top", direction, scale)
+        pix = self._sprites.get(key)
+        if pix is None:
+            body = self._render_body(0, direction, scale)
+            pix = self._rows(body, 0, self.tail_split(scale), scale)
+            self._sprites[key] = pix
+        return pix
+
+    def tail(self, tail, direction, scale):
+        """Tail strip at quantized phase tail, drawn at tail_top(scale)."""
+        key = ("tail", tail, direction, scale)
+        pix = self._sprites.get(key)
+        if pix is None:
+            body = self._render_body(tail, direction, scale)
+            pix = self._rows(body, self.tail_split(scale), body.height(),
+                             scale)
+            self._sprites[key] = pix
+        return pix
+
+    def _render_body(self, tail, direction, scale):
+        path = tail_path(tail)
+        return self._render(BODY_RECT, direction, scale,
+                            lambda p: draw_body(p, path))
+
+    @staticmethod
+    def _rows(pix, top, bottom, scale):
+        part = pix.copy(0, top, pix.width(), bottom - top)
+        part.setDevicePixelRatio(scale)
+        return part
+
+    def warm(self, scale):
+        """Render every sprite for scale up front."""
+        for direction in (1, -1):
+            for eyes in self.EYES:
+                self.face(eyes, None, direction, scale)
+            for i in range(SPARKLE_FRAMES):
+                self.face("open", i, direction, scale)
+            for mouth in self.MOUTHS:
+                self.mouth(mouth, direction, scale)
+            self.body_top(direction, scale)
+            for i in range(TAIL_FRAMES):
+                self.tail(i, direction, scale)
+
+    @staticmethod
+    def _render(rect, direction, scale, draw):
+        x0, y0, x1, y1 = _device_box(rect, scale)
+        pix = QPixmap(x1 - x0, y1 - y0)
+        pix.fill(Qt.transparent)
+        p = QPainter(pix)
+        p.setRenderHint(QPainter.Antialiasing)
+        # The canvas transform, shifted to the sprite's first device
+        # pixel. Scaled by hand, with the ratio set only afterwards: Qt
+        # doesn't scale painting on a pixmap with a ratio below 1.
+        p.translate(-x0, -y0)
+        p.scale(scale, scale)
+        p.translate(GHOST_OX, GHOST_OY)
+        if direction == -1:
+            p.translate(GHOST_W, 0)
+            p.scale(-1, 1)
+        draw(p)
+        p.end()
+        pix.setDevicePixelRatio(scale)
+        return pix
+
+
+class BubbleCache:
+    """Rendered speech bubbles, least recently used evicted first.
+
+    A bubble's message stays up for seconds, but laying out word-wrapped
+    text is the most expensive thing in a frame, so each (message,
+    width, scale, device pixel ratio) is rendered once to a pixmap
+    covering BUBBLE_RECT. Pixmaps carry devicePixelRatio == scale * dpr
+    and are drawn through a painter scaled by ghost_scale. The cache is
+    bounded by the pixel memory it holds, not by entry count, since a
+    bubble at scale 3 on a HiDPI screen is 36x the size of one at 1x.
+    """
+
+    def __init__(self, budget=8 * 1024 * 1024):
+        self.budget = budget
+        self.bytes = 0
+        self._pixmaps = OrderedDict()
+
+    def __len__(self):
+        return len(self._pixmaps)
+
+    def clear(self):
+        self._pixmaps.clear()
+        self.bytes = 0
+
+    def get(self, msg, width, scale, dpr=1.0):
+        key = (msg, width, scale, dpr)
+        pix = self._pixmaps.get(key)
+        if pix is not None:
+            self._pixmaps.move_to_end(key)
+            return pix
+
+        ratio = scale * dpr
+        rect = BUBBLE_RECT
+        pix = QPixmap(math.ceil(rect.width() * ratio),
+                      math.ceil(rect.height() * ratio))
+        pix.fill(Qt.transparent)
+        p = QPainter(pix)
+        p.setRenderHint(QPainter.Antialiasing)
+        # Scaled by hand like SpriteAtlas sprites, for ratios below 1
+        p.scale(ratio, ratio)
+        p.translate(-rect.x(), -rect.y())
+        draw_bubble(p, msg, width)
+        p.end()
+        pix.setDevicePixelRatio(ratio)
+
+        self._pixmaps[key] = pix
+        self.bytes += pix.width() * pix.height() * 4
+        # Always keep the newest, even if it alone is over budget
+        while self.bytes > self.budget and len(self._pixmaps) > 1:
+            _, old = self._pixmaps.popitem(last=False)
+            self.bytes -= old.width() * old.height() * 4
+        return pix
+
+
+# ── batched drawing ──────────────────────────────────────────────
+
+def ghost_origin(st, scale):
+    """Screen position of a ghost's 80x100 box (unscaled painter)."""
+    return (st.current_x - CX * scale,
+            st.current_y - CY * scale + st.float_offset)
+
+
+def ghost_screen_rect(st, scale):
+    """Screen rect covering a ghost's canvas, bubble included."""
+    x, y = ghost_origin(st, scale)
+    return QRect(int(x - GHOST_OX * scale) - 1, int(y - GHOST_OY * scale) - 1,
+                 math.ceil(CANVAS_W * scale) + 2, math.ceil(CANVAS_H * scale) + 2)
+
+
+def _add_fragment(batches, pix, x, y, rect, scale, dpr, opacity):
+    # rect is the sprite's sprite_rect(). Fragments are positioned by
+    # their center, in logical pixels, and ignore the sprite's
+    # devicePixelRatio: shrink them by the screen's
+    frags = batches.setdefault(pix.cacheKey(), (pix, []))[1]
+    frags.append(QPainter.PixmapFragment.create(
+        QPointF(x + (rect.x() + rect.width() / 2) * scale,
+                y + (rect.y() + rect.height() / 2) * scale),
+        QRectF(0, 0, pix.width(), pix.height()), 1 / dpr, 1 / dpr, 0,
+        opacity))
+
+
+def draw_ghost_batch(painter, ghosts, atlas, scale):
+    """Draw many ghosts with one drawPixmapFragments call per sprite.
+
+    painter must be unscaled and in screen coordinates. Ghosts are drawn
+    layer by layer (arms, bodies, faces, mouths, bubbles) rather than one
+    ghost at a time, so overlapping ghosts share layers.
+    """
+    bodies, faces, mouths = {}, {}, {}
+    extras = []
+    dpr = painter.device().devicePixelRatioF()
+    r = scale * dpr     # sprite raster scale
+    body_rect, face_rect, mouth_rect = (
+        sprite_rect(rect, r) for rect in (BODY_RECT, FACE_RECT, MOUTH_RECT))
+    for st in ghosts:
+        x, y = ghost_origin(st, scale)
+        op = st.opacity
+        d = st.direction
+        body = atlas.body(tail_frame(st.t * 3), d, r)
+        _add_fragment(bodies, body, x, y, body_rect, scale, dpr, op)
+        eyes, sparkle = face_key(st)
+        face = atlas.face(eyes, sparkle, d, r)
+        _add_fragment(faces, face, x, y, face_rect, scale, dpr, op)
+        mx, my = mouth_shake(st)
+        mouth = atlas.mouth(st.mouth, d, r)
+        _add_fragment(mouths, mouth, x + mx * scale, y + my * scale,
+                      mouth_rect, scale, dpr, op)
+        if st.arms_active or st.bubble_active:
+            extras.append((st, x, y))
+
+    # Arms sit behind the body and still animate continuously
+    for st, x, y in extras:
+        if not st.arms_active:
+            continue
+        painter.save()
+        painter.setOpacity(st.opacity)
+        painter.translate(x, y)
+        painter.scale(scale, scale)
+        if st.direction == -1:
+            painter.translate(GHOST_W, 0)
+            painter.scale(-1, 1)
+        draw_arms(painter, st.t - st.arms_start)
+        painter.restore()
+
+    for batches in (bodies, faces, mouths):
+        for pix, frags in batches.values():
+            painter.drawPixmapFragments(frags, pix)
+
+    for st, x, y in extras:
+        if not st.bubble_active:
+            continue
+        painter.save()
+        # Keep bubble readable even when ghost is faded
+        painter.setOpacity(max(st.opacity, 0.6))
+        painter.translate(x - GHOST_OX * scale, y - GHOST_OY * scale)
+        painter.scale(scale, scale)
+        painter.drawPixmap(BUBBLE_RECT.topLeft(), atlas.bubble(
+            st.bubble_msg, st.bubble_width, scale, dpr))
+        painter.restore()
@@ -0,0 +1,509 @@
+"""Qt-free simulation core for Ghost Pet.
+
+GhostState holds everything about one ghost — position, drift target,
+opacity waves and the blink/mouth/arms/sparkle/speech/scare state
+machines — and advances it with an explicit step(dt). Time is the
+state's own simulation time, and randomness comes from an injectable
+RNG, so a seeded ghost can be fast-forwarded through hours of behavior
+without Qt or an X server.
+
+Presentation (windows, painting, raise/lower) lives elsewhere and
+subscribes to state changes through listeners.
+"""
+
+import math
+import random
+import time
+
+import oscillators
+from scheduler import EventQueue
+
+
+class GhostState:
+    """Simulation state for a single ghost."""
+
+    SCARE_PHRASES = [
+        "BOO!!",
+        "Did I scare you?",
+        "Behind you!!",
+        "I see you~",
+        "*jumps out*",
+        "Peek-a-boo!",
+        "Miss me?",
+        "Surprise!!",
+        "Gotcha!",
+        "Still here~",
+        "You can't escape me!",
+        "I never left...",
+        "*appears menacingly*",
+        "Thought you lost me?",
+        "Guess who!",
+        "You looked away...",
+        "I was here the whole time",
+        "*materializes*",
+        "Boo from the beyond!",
+        "Can't get rid of me~",
+        "The walls have eyes!",
+        "*emerges from screen*",
+        "Right behind you!",
+        "I haunt this desktop now",
+        "Feeling a chill?",
+        "*phases into reality*",
+        "You forgot about me!",
+        "Knock knock... BOO!",
+        "The ghost is back!",
+        "I'm always watching~",
+    ]
+
+    PHRASES = [
+        "Boo! ~",
+        "I'm friendly!",
+        "*floats happily*",
+        "Spooky vibes~",
+        "Want a hug?",
+        "I like you!",
+        "*wiggles*",
+        "So cozy here~",
+        "Hewwo!",
+        "*happy ghost noises*",
+        "You're doing great!",
+        "Take a break?",
+        "Stay hydrated!",
+        "*peeks at you*",
+        "Boop!",
+        "I believe in you!",
+        "*sparkles*",
+        "Keep going!",
+        "You got this!",
+        "*floats around*",
+        "I'm here for the boos!",
+        "You're my ghoul friend~",
+        "I'm dead tired...",
+        "Just passing through!",
+        "Life is un-boo-lievable!",
+        "I've got spirit!",
+        "Don't ghost me!",
+        "Creeping it real~",
+        "Haunt you later!",
+        "If you got it, haunt it!",
+        "I'm having a fang-tastic day!",
+        "Ghosting is my thing~",
+        "You look boo-tiful!",
+        "I'm a little ghoul-ish~",
+        "Spook-tacular vibes!",
+        "The ghoul next door~",
+        "I ain't afraid of no work!",
+        "Fangs for being here!",
+        "Having a wail of a time!",
+        "*phases through wall*",
+        "Boo-lieve in yourself!",
+        "I'm just a lost soul~",
+        "Eek-xcuse me!",
+        "*rattles chains cutely*",
+        "I'm dead serious rn",
+        "That was eerie-sistible!",
+        "Ghouls just wanna have fun!",
+    ]
+
+    HELLO = "Boo! I'm your new friend!"
+
+    # Movement speed is expressed in pixels per this many seconds
+    SPEED_UNIT = 0.03
+    SCARE_DURATION = 5.0
+    # Events this close past the end of a step still run in it: the
+    # frame clock can't resolve a smaller wait, so a wakeup for them
+    # would land on the same time and find them still pending
+    TIME_EPSILON = 1e-9
+
+    def __init__(self, config, bounds, rng=None, clock=None, measure=None):
+        """
+        config: object with the Config attributes (speed, opacity_*, ...).
+        bounds: (x, y, right, bottom) area the ghost wanders in.
+        rng: random.Random-like source; defaults to a fresh Random().
+        clock: seconds callable used when step() is called without dt.
+        measure: phrase -> bubble width callable; defaults to a rough
+            estimate from the phrase length.
+        """
+        self.config = config
+        self._measure = measure or self.estimate_width
+        self.rng = rng or random.Random()
+        self._clock = clock or time.monotonic
+        self._last_clock = None
+        self._events = EventQueue()
+        self.listeners = []
+
+        # Simulation time in seconds since creation
+        self.t = 0.0
+
+        self.bounds_x, self.bounds_y, self.bounds_right, self.bounds_bottom = bounds
+        # current_x/y = ghost body center on screen
+        self.current_x = (self.bounds_x + self.bounds_right) // 2
+        self.current_y = (self.bounds_y + self.bounds_bottom) // 2
+        self.target_x = 0
+        self.target_y = 0
+        self.moving = False
+        self.direction = 1  # 1 = right, -1 = left
+        # Steering away from other ghosts, as a fraction of drift speed;
+        # set from outside (see separation.py), zero for a lone ghost
+        self.push_x = 0.0
+        self.push_y = 0.0
+
+        # Float and opacity
+        self.float_offset = 0.0
+        self.opacity = 1.0
+        # Random phase offsets for organic-feeling opacity waves
+        self.opacity_phases = [self.rng.uniform(0, math.tau) for _ in range(3)]
+
+        # Speech bubble
+        self.bubble_msg = ""
+        self.bubble_active = False
+        self.bubble_width = 150
+        self._bubble_event = None
+        self._phrase_queue = []
+
+        # Eyes: blinking with style "closed" or "squint" (><)
+        self.blinking = False
+        self.blink_style = "closed"
+        self.sparkle_active = False
+        self.sparkle_start = 0.0
+
+        # Mouth: "normal", "O", "happy"
+        self.mouth = "normal"
+        self.mouth_start = 0.0
+
+        # Arms — little nubs that poke out from the sides
+        self.arms_active = False
+        self.arms_start = 0.0
+
+        # Scare
+        self.scare_active = False
+        self.scare_start = 0.0
+        self.scare_duration = self.SCARE_DURATION
+        self._scare_event = None
+
+        self.wander_event = self._events.schedule(
+            5.0, self.pick_new_destination, 5.0)
+        self.speak_event = self._events.schedule(
+            self.config.speak_interval, self.say_random_phrase,
+            self.config.speak_interval)
+        if self.config.scare_enabled:
+            self._schedule_next_scare()
+        self._schedule_next_blink()
+        self._schedule_next_sparkle()
+        self._schedule_next_mouth()
+        self._schedule_next_arms()
+
+        self.pick_new_destination()
+        self.call_later(1.0, lambda: self.say_phrase(self.HELLO))
+
+        self._update_float()
+
+    # ── scheduling ───────────────────────────────────────────────
+
+    def call_later(self, delay, callback):
+        """Run callback after delay seconds of simulation time."""
+        return self._events.schedule(self.t + delay, callback)
+
+    def next_event_due(self):
+        """Simulation time of the next pending event, or None."""
+        return self._events.next_due()
+
+    def _emit(self, name, **data):
+        for listener in self.listeners:
+            listener(name, data)
+
+    # ── stepping ─────────────────────────────────────────────────
+
+    def step(self, dt=None):
+        """Advance the simulation by dt seconds.
+
+        Without dt, advance by the time elapsed on the injected clock
+        since the previous call. Events are run at their exact due times,
+        with movement integrated up to each one, so a single large step
+        gives the same result as many small ones.
+        """
+        if dt is None:
+            now = self._clock()
+            dt = 0.0 if self._last_clock is None else now - self._last_clock
+            self._last_clock = now
+        end = self.t + max(0.0, dt)
+
+        while True:
+            due = self._events.next_due()
+            if due is None or due > end + self.TIME_EPSILON:
+                break
+            self._advance(max(0.0, due - self.t))
+            self._events.run_due(due)
+        self._advance(max(0.0, end - self.t))
+        self._update_float()
+
+    def _advance(self, dt):
+        self.t += dt
+        self._update_position(dt)
+
+    def _update_position(self, dt):
+        """Drift toward the target, picking a new one on arrival."""
+        budget = self.config.speed * dt / self.SPEED_UNIT
+        if self.push_x or self.push_y:
+            margin = 50
+            self.current_x = min(max(self.current_x + self.push_x * budget,
+                                     self.bounds_x + margin),
+                                 self.bounds_right - margin)
+            self.current_y = min(max(self.current_y + self.push_y * budget,
+                                     self.bounds_y + margin),
+                                 self.bounds_bottom - margin)
+        while self.moving and budget > 0:
+            dx = self.target_x - self.current_x
+            dy = self.target_y - self.current_y
+            distance = math.sqrt(dx * dx + dy * dy)
+
+            if distance < budget:
+                self.current_x = self.target_x
+                self.current_y = self.target_y
+                self.moving = False
+                budget -= distance
+                # Immediately pick a new destination — keeps the ghost always
+                # drifting. It happens at the moment of arrival, not at the
+                # end of the step, so its time doesn't depend on frame rate.
+                end = self.t
+                self.t -= budget * self.SPEED_UNIT / self.config.speed
+                self.pick_new_destination()
+                self.t = end
+            else:
+                self.current_x += (dx / distance) * budget
+                self.current_y += (dy / distance) * budget
+                budget = 0
+
+    def _update_float(self):
+        t = self.t
+        self.float_offset = oscillators.FLOAT(t)
+
+        if self.scare_active:
+            self._scare_tick()
+            return
+
+        # Ghostly opacity
+        wave = oscillators.OPACITY(t, self.opacity_phases,
+                                   self.config.opacity_speed)
+        self.opacity = max(self.config.opacity_min,
+                           min(self.config.opacity_max, 0.55 + wave))
+
+    def pick_new_destination(self):
+        margin = 100
+        self.target_x = self.rng.randint(self.bounds_x + margin,
+                                         self.bounds_right - margin)
+        self.target_y = self.rng.randint(self.bounds_y + margin,
+                                         self.bounds_bottom - margin)
+        self.moving = True
+
+        if self.target_x > self.current_x:
+            self.direction = 1
+        else:
+            self.direction = -1
+        self._emit("destination", x=self.target_x, y=self.target_y)
+
+    # ── presentation hints ───────────────────────────────────────
+
+    def is_faded(self):
+        """True while the ghost sits at opacity_min with nothing to show."""
+        return (not self.scare_active and not self.bubble_active
+                and self.opacity <= self.config.opacity_min + 0.001)
+
+    def frame_rate(self):
+        """Frame rate the current animation actually needs."""
+        if (self.scare_active or self.arms_active or self.sparkle_active
+                or self.mouth == "O"):
+            fps = self.config.fps_active
+        elif self.is_faded():
+            # Barely visible — only wake often enough to notice fading back in
+            fps = self.config.fps_faded
+        else:
+            fps = self.config.fps_drift
+        cap = self.config.power.fps_cap
+        return fps if cap is None else min(fps, cap)
+
+    # ── config ───────────────────────────────────────────────────
+
+    def apply_config(self):
+        """Re-arm timers that depend on config values."""
+        self.speak_event.cancel()
+        self.speak_event = self._events.schedule(
+            self.t + self.config.speak_interval, self.say_random_phrase,
+            self.config.speak_interval)
+        self._phrase_queue = []
+
+        scare_pending = self._scare_event is not None and self._scare_event.active
+        if not self.config.scare_enabled:
+            if scare_pending:
+                self._scare_event.cancel()
+        elif not scare_pending and not self.scare_active:
+            self._schedule_next_scare()
+
+    # ── speech bubble ────────────────────────────────────────────
+
+    def dismiss_bubble(self):
+        was_active = self.bubble_active
+        self.bubble_active = False
+        if self._bubble_event is not None:
+            self._bubble_event.cancel()
+            self._bubble_event = None
+        if was_active:
+            self._emit("bubble_end")
+
+    def say_phrase(self, phrase):
+        self.bubble_msg = phrase
+        self.bubble_width = self._measure(phrase)
+        self.bubble_active = True
+        if self._bubble_event is not None:
+            self._bubble_event.cancel()
+        self._bubble_event = self.call_later(3.0, self.dismiss_bubble)
+        self._emit("say", phrase=phrase)
+
+    @staticmethod
+    def estimate_width(phrase):
+        """Bubble width guess for when no font metrics are available."""
+        return max(150, len(phrase) * 10 + 40)
+
+    @classmethod
+    def all_phrases(cls, config):
+        """Every phrase a ghost with this config may say."""
+        return ([cls.HELLO]
+                + list(config.custom_phrases or cls.PHRASES)
+                + list(config.custom_scare_phrases or cls.SCARE_PHRASES))
+
+    def _next_phrase(self):
+        phrases = self.config.custom_phrases or self.PHRASES
+        if not self._phrase_queue:
+            self._phrase_queue = self.rng.sample(phrases, len(phrases))
+        return self._phrase_queue.pop()
+
+    def say_random_phrase(self):
+        if self.rng.random() < self.config.speak_chance:
+            self.say_phrase(self._next_phrase())
+
+    # ── eye animations ───────────────────────────────────────────
+
+    def _schedule_next_blink(self):
+        self.call_later(self.rng.uniform(3.0, 7.0), self._start_blink)
+
+    def _start_blink(self):
+        self.blink_style = self.rng.choice(["closed", "closed", "squint"])
+        self.blinking = True
+        self._emit("blink", style=self.blink_style)
+        duration = 0.15 if self.blink_style == "closed" else 0.3
+        self.call_later(duration, self._end_blink)
+
+    def _end_blink(self):
+        self.blinking = False
+        self._emit("blink_end")
+        self._schedule_next_blink()
+
+    def _schedule_next_sparkle(self):
+        self.call_later(self.rng.uniform(20.0, 40.0), self._start_sparkle)
+
+    def _start_sparkle(self):
+        if not self.config.power.sparkles:
+            # Power saving; try again next time around
+            self._schedule_next_sparkle()
+            return
+        self.sparkle_active = True
+        self.sparkle_start = self.t
+        self._emit("sparkle")
+        self.call_later(2.0, self._end_sparkle)
+
+    def _end_sparkle(self):
+        self.sparkle_active = False
+        self._emit("sparkle_end")
+        self._schedule_next_sparkle()
+
+    def _schedule_next_mouth(self):
+        self.call_later(self.rng.uniform(10.0, 25.0), self._start_mouth)
+
+    def _start_mouth(self):
+        self.mouth = self.rng.choice(["O", "happy"])
+        self.mouth_start = self.t
+        self._emit("mouth", mouth=self.mouth)
+        duration = 1.5 if self.mouth == "O" else 2.0
+        self.call_later(duration, self._end_mouth)
+
+    def _end_mouth(self):
+        self.mouth = "normal"
+        self._emit("mouth_end")
+        self._schedule_next_mouth()
+
+    # ── arms ─────────────────────────────────────────────────────
+
+    def _schedule_next_arms(self):
+        self.call_later(self.rng.uniform(15.0, 35.0), self._start_arms)
+
+    def _start_arms(self):
+        if not self.config.power.arms:
+            self._schedule_next_arms()
+            return
+        self.arms_active = True
+        self.arms_start = self.t
+        self._emit("arms")
+        self.call_later(3.0, self._end_arms)
+
+    def _end_arms(self):
+        self.arms_active = False
+        self._emit("arms_end")
+        self._schedule_next_arms()
+
+    # ── scare ────────────────────────────────────────────────────
+
+    def _schedule_next_scare(self):
+        lo = self.config.scare_min_minutes * 60
+        hi = self.config.scare_max_minutes * 60
+        if lo > hi:
+            lo, hi = hi, lo
+        delay = self.rng.uniform(lo, hi) * self.config.power.scare_factor
+        # A manual scare() reschedules too; keep a single chain
+        if self._scare_event is not None:
+            self._scare_event.cancel()
+        self._scare_event = self.call_later(delay, self._start_scare)
+
+    def _start_scare(self):
+        """Called by the scare timer — respects scare_enabled setting."""
+        if not self.config.scare_enabled:
+            self._schedule_next_scare()
+            return
+        self.scare()
+
+    def scare(self):
+        """Start a scare (always runs, even if scare is disabled)."""
+        if self.scare_active:
+            return
+        self.scare_active = True
+        self.scare_start = self.t
+        self.scare_duration = self.SCARE_DURATION
+
+        # Start fully transparent then fade in
+        self.opacity = 0.0
+        self._emit("scare")
+
+        # Say a scare phrase
+        scare_phrases = self.config.custom_scare_phrases or self.SCARE_PHRASES
+        self.say_phrase(self.rng.choice(scare_phrases))
+        self.call_later(self.scare_duration, self._end_scare)
+
+    def _end_scare(self):
+        # Done — fade complete
+        self.scare_active = False
+        self.dismiss_bubble()
+        self._emit("scare_end")
+        if self.config.scare_enabled:
+            self._schedule_next_scare()
+
+    def _scare_tick(self):
+        t = (self.t - self.scare_start) / self.scare_duration  # 0.0 → 1.0
+
+        # Fade curve: in for first 30%, hold for middle 40%, out for last 30%
+        if t < 0.3:
+            opacity = t / 0.3                 # 0 → 1
+        elif t < 0.7:
+            opacity = 1.0                      # hold at full
+        else:
+            opacity = max(0.0, 1.0 - (t - 0.7) / 0.3)   # 1 → 0
+
+        self.opacity = opacity
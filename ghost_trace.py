@@ -0,0 +1,189 @@
+"""Record a ghost's session to a trace file and replay it exactly.
+
+A GhostState is deterministic given its RNG seed, its config, its
+bounds and the few inputs that come from outside the simulation: scares
+from the tray menu, config changes from settings, and power profile
+switches. A trace stores exactly those, plus every event the state
+emitted so that a replay can be checked against the original run. It is
+JSON lines, t in simulation seconds:
+
+    {"trace": 1, "seed": 1234, "bounds": [0, 0, 1920, 1080], "config": {}}
+    {"t": 5.0, "event": "destination", "x": 812, "y": 440}
+    {"t": 41.3, "input": "scare"}
+    {"t": 90.2, "input": "config", "config": {}}
+    {"t": 120.0, "input": "power", "config": {}}
+
+Record with `ghost_pet.py --record FILE [--seed N]`; replay with
+`benchmark.py --replay FILE`, which drives a GhostPet through the same
+session as fast as it can render and times every frame.
+
+Qt-free: the recorder, drive() and replay() only touch the ghost's
+state, its _do_scare(), apply_config() and apply_power(), and the frame
+clock's step().
+"""
+
+import json
+from collections import namedtuple
+
+FORMAT = 1
+
+Trace = namedtuple("Trace", "seed bounds config inputs events")
+
+# Events match when their times agree to this many seconds; the state
+# runs events at exact due times, so only float rounding differs
+TOLERANCE = 1e-5
+
+
+def config_snapshot(config):
+    """Config values that affect the simulation, JSON-ready."""
+    snap = config.as_dict()
+    snap["auto_profile"] = config.auto_profile
+    return snap
+
+
+def restore_config(config, snap):
+    for k, v in snap.items():
+        setattr(config, k, list(v) if isinstance(v, list) else v)
+
+
+class TraceRecorder:
+    """Writes a GhostPet's inputs and state events to a trace file."""
+
+    def __init__(self, ghost, path, seed):
+        self._ghost = ghost
+        self._state = ghost.state
+        self._file = open(path, "w")
+        self._write({"trace": FORMAT, "seed": seed,
+                     "bounds": [self._state.bounds_x, self._state.bounds_y,
+                                self._state.bounds_right,
+                                self._state.bounds_bottom],
+                     "config": config_snapshot(ghost.config)})
+        self._state.listeners.append(self._on_event)
+        # Inputs are logged before they reach the state, so they come
+        # ahead of the events they cause
+        scare = ghost._do_scare
+        apply_config, apply_power = ghost.apply_config, ghost.apply_power
+
+        def recorded_scare():
+            self._write({"t": self._t(), "input": "scare"})
+            scare()
+
+        def recorded_apply_config():
+            self._write({"t": self._t(), "input": "config",
+                         "config": config_snapshot(ghost.config)})
+            apply_config()
+
+        def recorded_apply_power():
+            self._write({"t": self._t(), "input": "power",
+                         "config": config_snapshot(ghost.config)})
+            apply_power()
+
+        ghost._do_scare = recorded_scare
+        ghost.apply_config = recorded_apply_config
+        ghost.apply_power = recorded_apply_power
+
+    def _t(self):
+        return round(self._state.t, 6)
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        # A trace matters most when the session crashed or was killed,
+        # so don't leave records in the buffer; there are only a few
+        # per second
+        self._file.flush()
+
+    def _on_event(self, name, data):
+        record = {"t": self._t(), "event": name}
+        record.update(data)
+        self._write(record)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def load(path):
+    """Read a trace file into a Trace."""
+    inputs, events = [], []
+    with open(path) as f:
+        header = json.loads(f.readline())
+        if header.get("trace") != FORMAT:
+            raise ValueError(f"{path}: not a version {FORMAT} ghost trace")
+        for line in f:
+            if not line.strip():
+                continue
+            if not line.endswith("\n"):
+                # Cut off mid-record when the session was killed
+                break
+            record = json.loads(line)
+            if "input" in record:
+                inputs.append(record)
+            else:
+                events.append(record)
+    return Trace(header["seed"], tuple(header["bounds"]), header["config"],
+                 inputs, events)
+
+
+def drive(trace, ghost, clock, times, on_frame=None):
+    """Step ghost to each simulation time in times, in order.
+
+    Feeds the trace's inputs at their recorded times on the way and
+    calls on_frame() after reaching each time. Steps may be any size:
+    the state runs events at their exact due times regardless.
+    """
+    state = ghost.state
+    inputs = list(reversed(trace.inputs))
+    for t in times:
+        while inputs and inputs[-1]["t"] <= t:
+            record = inputs.pop()
+            clock.step(max(0.0, record["t"] - state.t))
+            if record["input"] == "scare":
+                ghost._do_scare()
+            elif record["input"] == "config":
+                restore_config(ghost.config, record["config"])
+                ghost.apply_config()
+            elif record["input"] == "power":
+                restore_config(ghost.config, record["config"])
+                ghost.apply_power()
+        clock.step(max(0.0, t - state.t))
+        if on_frame is not None:
+            on_frame()
+
+
+def replay(trace, ghost, clock, fps=30.0, on_frame=None):
+    """Drive ghost through the whole trace at fps with a paused clock.
+
+    ghost must have been created from the trace: config restored from
+    trace.config, bounds=trace.bounds and rng=random.Random(trace.seed).
+    Returns the events the state emitted, in trace format, for compare().
+    """
+    state = ghost.state
+    events = []
+
+    def on_event(name, data):
+        record = {"t": round(state.t, 6), "event": name}
+        record.update(data)
+        events.append(record)
+
+    state.listeners.append(on_event)
+    try:
+        end = max([r["t"] for r in trace.events + trace.inputs] or [0.0])
+        frames = int(end * fps) + 2
+        drive(trace, ghost, clock, (i / fps for i in range(1, frames)),
+              on_frame)
+    finally:
+        state.listeners.remove(on_event)
+    return events
+
+
+def compare(expected, actual):
+    """Index of the first event that differs, or None if all match."""
+    for i, (a, b) in enumerate(zip(expected, actual)):
+        if (a["event"] != b["event"] or abs(a["t"] - b["t"]) > TOLERANCE
+                or {k: v for k, v in a.items() if k != "t"}
+                != {k: v for k, v in b.items() if k != "t"}):
+            return i
+    if len(actual) < len(expected):
+        return len(actual)
+    return None
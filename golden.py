@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Golden-image checks for Ghost Pet's rendering.
+
+Renders every discrete ghost state (eyes, mouths, arm extensions,
+sparkle and tail frames, bubbles, scare, both directions, ghost_scale
+values across the settings range) offscreen through
+GhostPet.paintEvent and compares each with a stored PNG, pixel by pixel
+with NumPy.
+
+    python3 golden.py --update      # store the current rendering
+    python3 golden.py               # compare against it
+    python3 golden.py -k arms       # only cases with "arms" in the name
+
+Golden images depend on the Qt version and the installed fonts, so they
+are not checked in. Store them from a known-good tree on the machine
+that will run the comparison, make the change, then compare. Cases that
+differ get an image in --diff-dir showing the new rendering with the
+differing pixels in red. Exits with status 1 if any case differs.
+"""
+
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+os.environ.setdefault("GHOST_PET_QPA_PLATFORM", "offscreen")
+# Render with default settings, not whatever the user has configured
+os.environ["XDG_CONFIG_HOME"] = tempfile.mkdtemp(prefix="ghost-pet-golden-")
+
+import ghost_pet
+import ghost_render
+from frame_clock import FrameClock
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Across the settings slider's 0.5-3.0 range: on the half-pixel grid,
+# where sprite edges fall on whole pixels, and off it (sub-1 included)
+SCALES = (0.5, 0.7, 1.0, 1.1, 1.3, 1.5, 1.7, 2.0, 2.2, 2.5, 2.7, 3.0)
+
+# Animation time every case is rendered at, unless it sets its own
+T = 100.0
+
+
+def _cases():
+    """(name, GhostState attribute overrides) for every state to check."""
+    yield "idle", {}
+    for style in ("closed", "squint"):
+        yield f"eyes-{style}", {"blinking": True, "blink_style": style}
+    for mouth in ("O", "happy"):
+        for at in (0.0, 0.1):
+            yield f"mouth-{mouth}-{at:g}", {"mouth": mouth,
+                                            "mouth_start": T - at}
+    # Easing in, full reach, wiggling, easing out
+    for at in (0.1, 0.2, 0.4, 1.0, 2.8):
+        yield f"arms-{at:g}", {"arms_active": True, "arms_start": T - at}
+    # Mid-frame phases, so float noise can't tip them into a neighbor
+    step = ghost_render.SPARKLE_PERIOD / ghost_render.SPARKLE_FRAMES
+    for frame in range(0, ghost_render.SPARKLE_FRAMES, 6):
+        # face_key() runs the sparkle phase at 4x time
+        yield f"sparkle-{frame}", {
+            "sparkle_active": True,
+            "sparkle_start": T - (frame + 0.5) * step / 4}
+    for frame in range(0, ghost_render.TAIL_FRAMES, 8):
+        yield f"tail-{frame}", {
+            "t": (frame + 0.5) / ghost_render.TAIL_FRAMES * math.tau / 3}
+    yield "faded", {"opacity": 0.3}
+    for name, msg in (("short", "Boop!"),
+                      ("long", "I'm having a fang-tastic day!")):
+        yield f"bubble-{name}", {"bubble_active": True, "bubble_msg": msg}
+    # Halfway through the fade-in
+    yield "scare", {"scare_active": True, "scare_start": T - 0.75,
+                    "scare_duration": 5.0, "opacity": 0.5,
+                    "bubble_active": True, "bubble_msg": "BOO!!",
+                    "mouth": "O", "mouth_start": T - 0.75}
+
+
+def cases():
+    """Every (case name, scale, direction, overrides) combination."""
+    for scale in SCALES:
+        for name, attrs in _cases():
+            for direction in (1, -1):
+                side = "" if direction == 1 else "-left"
+                yield f"{name}@{scale:g}{side}", scale, direction, attrs
+
+
+def _array(image):
+    """QImage as an (h, w, 4) uint8 array of premultiplied ARGB."""
+    image = image.convertToFormat(QImage.Format_ARGB32_Premultiplied)
+    w, h = image.width(), image.height()
+    bits = image.constBits()
+    bits.setsize(image.byteCount())
+    rows = np.frombuffer(bits, np.uint8).reshape(h, image.bytesPerLine())
+    return rows[:, :w * 4].reshape(h, w, 4).copy()
+
+
+def _diff_image(current, bad):
+    """The current rendering, opaque, with pixels in bad painted red."""
+    out = current.copy()
+    out[..., 3] = 255
+    out[bad] = (0, 0, 255, 255)     # BGRA in memory
+    h, w = bad.shape
+    return QImage(out.data, w, h, w * 4,
+                  QImage.Format_ARGB32_Premultiplied).copy()
+
+
+class Renderer:
+    """One GhostPet per scale, posed per case and rendered to a QImage."""
+
+    def __init__(self):
+        self.app = QApplication.instance() or QApplication(sys.argv[:1])
+        self._ghosts = {}
+
+    def _ghost(self, scale):
+        entry = self._ghosts.get(scale)
+        if entry is None:
+            config = ghost_pet.Config()
+            config.ghost_scale = scale
+            ghost = ghost_pet.GhostPet(config, clock=FrameClock(paused=True))
+            ghost.apply_config()
+            baseline = {k: getattr(ghost.state, k)
+                        for _, attrs in _cases() for k in attrs}
+            baseline.update(t=T, opacity=1.0)
+            self._ghosts[scale] = entry = (ghost, baseline)
+        return entry
+
+    def render(self, scale, direction, attrs):
+        ghost, baseline = self._ghost(scale)
+        state = ghost.state
+        for k, v in baseline.items():
+            setattr(state, k, v)
+        for k, v in attrs.items():
+            setattr(state, k, v)
+        state.direction = direction
+        if state.bubble_active:
+            state.bubble_width = ghost_render.bubble_text.width(
+                state.bubble_msg)
+        image = QImage(ghost.size(), QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        ghost.render(image)
+        return image
+
+
+def run(golden_dir, diff_dir, pattern=None, update=False, tolerance=2,
+        max_pixels=0):
+    """Check (or with update, store) every case; returns failure count."""
+    renderer = Renderer()
+    os.makedirs(golden_dir, exist_ok=True)
+    counts = {"ok": 0, "differ": 0, "missing": 0, "stored": 0}
+    t0 = time.perf_counter()
+
+    for name, scale, direction, attrs in cases():
+        if pattern and pattern not in name:
+            continue
+        image = renderer.render(scale, direction, attrs)
+        path = os.path.join(golden_dir, name + ".png")
+        if update:
+            image.save(path)
+            counts["stored"] += 1
+            continue
+        if not os.path.exists(path):
+            print(f"MISSING  {name}")
+            counts["missing"] += 1
+            continue
+
+        current, golden = _array(image), _array(QImage(path))
+        if current.shape != golden.shape:
+            print(f"DIFFER   {name}: size {golden.shape[1]}x"
+                  f"{golden.shape[0]} -> {current.shape[1]}x"
+                  f"{current.shape[0]}")
+            counts["differ"] += 1
+            continue
+        delta = np.abs(current.astype(np.int16) - golden).max(axis=2)
+        bad = delta > tolerance
+        count = int(bad.sum())
+        if count > max_pixels:
+            print(f"DIFFER   {name}: {count} pixels, max delta "
+                  f"{int(delta.max())}")
+            os.makedirs(diff_dir, exist_ok=True)
+            _diff_image(current, bad).save(
+                os.path.join(diff_dir, name + ".png"))
+            counts["differ"] += 1
+        else:
+            counts["ok"] += 1
+
+    elapsed = time.perf_counter() - t0
+    summary = ", ".join(f"{v} {k}" for k, v in counts.items() if v)
+    print(f"{sum(counts.values())} cases: {summary or 'none'} "
+          f"({elapsed:.1f} s)")
+    return counts["differ"] + counts["missing"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--update", action="store_true",
+                        help="store the current rendering as the golden images")
+    parser.add_argument("-k", metavar="TEXT",
+                        help="only cases whose name contains TEXT")
+    parser.add_argument("--golden-dir", default=os.path.join(HERE, "golden"),
+                        help="where golden images live (default: ./golden)")
+    parser.add_argument("--diff-dir",
+                        default=os.path.join(HERE, "golden", "diff"),
+                        help="where to write images of differing cases "
+                             "(default: ./golden/diff)")
+    parser.add_argument("--tolerance", type=int, default=2,
+                        help="largest per-channel difference that still "
+                             "matches (default: 2)")
+    parser.add_argument("--max-pixels", type=int, default=0,
+                        help="pixels per case allowed past the tolerance "
+                             "(default: 0)")
+    args = parser.parse_args()
+
+    failures = run(args.golden_dir, args.diff_dir, args.k, args.update,
+                   args.tolerance, args.max_pixels)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
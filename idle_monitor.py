@@ -0,0 +1,210 @@
+"""Notice when nobody can see the ghost: screen saver, lock, monitor off.
+
+IdleMonitor polls every backend that is available:
+
+- the X11 MIT-SCREEN-SAVER extension (libXss, via ctypes) for an active
+  screen saver or blanked screen, plus DPMS (libXext) for a monitor
+  that is powered down;
+- the session D-Bus org.freedesktop.ScreenSaver service (GetActive and
+  its ActiveChanged signal), which also sees screen lockers that leave
+  the X screen saver state alone, and is all there is on Wayland.
+
+The screen counts as unseen if any backend says so. It emits
+suspendedChanged(bool) on transitions. Its poll timer is its own, not
+the frame clock's, so it keeps running while the clock is paused.
+Without any backend it never reports suspended.
+
+Manual check under Xvfb (or any X server):
+
+    python3 idle_monitor.py &
+    xset s activate        # suspended
+    xset s reset           # resumed
+"""
+
+import ctypes
+import ctypes.util
+
+from PyQt5.QtCore import Qt, QObject, QTimer, pyqtSignal, pyqtSlot
+
+try:
+    from PyQt5.QtDBus import QDBusConnection, QDBusInterface
+except ImportError:
+    QDBusConnection = None
+
+_SCREEN_SAVER_ON = 1    # XScreenSaverInfo.state
+_DPMS_MODE_ON = 0
+
+
+class _XScreenSaverInfo(ctypes.Structure):
+    _fields_ = [
+        ("window", ctypes.c_ulong),
+        ("state", ctypes.c_int),
+        ("kind", ctypes.c_int),
+        ("til_or_since", ctypes.c_ulong),
+        ("idle", ctypes.c_ulong),
+        ("eventMask", ctypes.c_ulong),
+    ]
+
+
+def _load(name):
+    path = ctypes.util.find_library(name)
+    return ctypes.CDLL(path) if path else None
+
+
+class _X11Backend:
+    """Screen saver and DPMS state from our own X connection."""
+
+    name = "x11"
+
+    def __init__(self):
+        xlib, xss = _load("X11"), _load("Xss")
+        if xlib is None or xss is None:
+            raise OSError("libX11/libXss not found")
+        xlib.XOpenDisplay.restype = ctypes.c_void_p
+        xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        xlib.XDefaultRootWindow.restype = ctypes.c_ulong
+        xlib.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        xlib.XFree.argtypes = [ctypes.c_void_p]
+        xss.XScreenSaverQueryExtension.argtypes = [
+            ctypes.c_void_p, ctypes.POINTER(ctypes.c_int),
+            ctypes.POINTER(ctypes.c_int)]
+        xss.XScreenSaverAllocInfo.restype = ctypes.POINTER(_XScreenSaverInfo)
+        xss.XScreenSaverQueryInfo.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong,
+            ctypes.POINTER(_XScreenSaverInfo)]
+
+        display = xlib.XOpenDisplay(None)
+        if not display:
+            raise OSError("cannot open X display")
+        event_base, error_base = ctypes.c_int(), ctypes.c_int()
+        if not xss.XScreenSaverQueryExtension(
+                display, ctypes.byref(event_base), ctypes.byref(error_base)):
+            xlib.XCloseDisplay(display)
+            raise OSError("no MIT-SCREEN-SAVER extension")
+
+        self._xlib = xlib
+        self._xss = xss
+        self._display = display
+        self._root = xlib.XDefaultRootWindow(display)
+        self._info = xss.XScreenSaverAllocInfo()
+        self._dpms = self._init_dpms()
+
+    def _init_dpms(self):
+        xext = _load("Xext")
+        if xext is None:
+            return None
+        xext.DPMSCapable.argtypes = [ctypes.c_void_p]
+        xext.DPMSInfo.argtypes = [
+            ctypes.c_void_p, ctypes.POINTER(ctypes.c_ushort),
+            ctypes.POINTER(ctypes.c_ubyte)]
+        if not xext.DPMSCapable(self._display):
+            return None
+        return xext
+
+    def suspended(self):
+        self._xss.XScreenSaverQueryInfo(self._display, self._root, self._info)
+        if self._info.contents.state == _SCREEN_SAVER_ON:
+            return True
+        if self._dpms is not None:
+            level, enabled = ctypes.c_ushort(), ctypes.c_ubyte()
+            self._dpms.DPMSInfo(self._display, ctypes.byref(level),
+                                ctypes.byref(enabled))
+            if enabled.value and level.value != _DPMS_MODE_ON:
+                return True
+        return False
+
+    def close(self):
+        if self._display:
+            self._xlib.XFree(self._info)
+            self._xlib.XCloseDisplay(self._display)
+            self._display = None
+
+
+class _DBusBackend:
+    """org.freedesktop.ScreenSaver on the session bus."""
+
+    name = "dbus"
+
+    SERVICE = "org.freedesktop.ScreenSaver"
+    PATH = "/org/freedesktop/ScreenSaver"
+
+    def __init__(self, on_change):
+        if QDBusConnection is None:
+            raise OSError("QtDBus not available")
+        bus = QDBusConnection.sessionBus()
+        if not bus.isConnected():
+            raise OSError("no session bus")
+        self._iface = QDBusInterface(self.SERVICE, self.PATH, self.SERVICE, bus)
+        if not self._iface.isValid():
+            raise OSError(f"{self.SERVICE} not available")
+        # Push notification; polling stays as a safety net
+        bus.connect(self.SERVICE, self.PATH, self.SERVICE, "ActiveChanged",
+                    on_change)
+
+    def suspended(self):
+        reply = self._iface.call("GetActive")
+        args = reply.arguments()
+        return bool(args and args[0])
+
+    def close(self):
+        pass
+
+
+class IdleMonitor(QObject):
+    """Emits suspendedChanged(True) while the screen can't be seen."""
+
+    suspendedChanged = pyqtSignal(bool)
+
+    def __init__(self, interval=2.0, parent=None):
+        super().__init__(parent)
+        self.suspended = False
+        self.backends = []
+        for make in (_X11Backend,
+                     lambda: _DBusBackend(self._on_active_changed)):
+            try:
+                self.backends.append(make())
+            except OSError:
+                pass
+
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.VeryCoarseTimer)
+        self._timer.timeout.connect(self.poll)
+        if self.backends:
+            self._timer.start(int(interval * 1000))
+
+    def poll(self):
+        suspended = any(self._suspended(b) for b in self.backends)
+        if suspended != self.suspended:
+            self.suspended = suspended
+            self.suspendedChanged.emit(suspended)
+
+    @staticmethod
+    def _suspended(backend):
+        try:
+            return backend.suspended()
+        except Exception:
+            # A backend that stops answering must not freeze the ghost
+            return False
+
+    @pyqtSlot(bool)
+    def _on_active_changed(self, active):
+        self.poll()
+
+    def close(self):
+        self._timer.stop()
+        for backend in self.backends:
+            backend.close()
+
+
+if __name__ == "__main__":
+    import sys
+    from PyQt5.QtCore import QCoreApplication
+
+    app = QCoreApplication(sys.argv)
+    monitor = IdleMonitor(interval=0.5)
+    print("backends:", [b.name for b in monitor.backends] or None,
+          flush=True)
+    monitor.suspendedChanged.connect(
+        lambda s: print("suspended" if s else "resumed", flush=True))
+    sys.exit(app.exec_())
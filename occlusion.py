@@ -0,0 +1,223 @@
+"""Tell when a ghost window is completely covered by other windows.
+
+The ghost lives below everything else, so it often spends hours behind
+a maximized editor. OcclusionMonitor asks the window manager for the
+stacking order (_NET_CLIENT_LIST_STACKING) on a slow cadence and caches,
+for each watched window, the region covered by the windows above it.
+Checking a ghost against that cache every frame is a QRegion operation,
+not an X round trip.
+
+Windows with a 32-bit (ARGB) visual are treated as see-through and never
+cover anything; so are the watched windows themselves. X11 only: on
+other platforms nothing is ever reported as covered, and callers should
+also check QWindow.isExposed() for minimized or unmapped windows.
+
+X reports geometry in native pixels. Under high-DPI scaling
+(QT_SCALE_FACTOR, or per-screen scale factors) a widget's geometry is in
+logical pixels, so it is mapped to native pixels before comparing.
+"""
+
+import ctypes
+import ctypes.util
+
+from PyQt5.QtCore import QObject, QPoint, QRect, QRectF
+from PyQt5.QtGui import QRegion
+
+_IS_VIEWABLE = 2        # XWindowAttributes.map_state
+_XA_WINDOW = 33
+_SUCCESS = 0
+
+
+class _XWindowAttributes(ctypes.Structure):
+    _fields_ = [
+        ("x", ctypes.c_int), ("y", ctypes.c_int),
+        ("width", ctypes.c_int), ("height", ctypes.c_int),
+        ("border_width", ctypes.c_int),
+        ("depth", ctypes.c_int),
+        ("visual", ctypes.c_void_p),
+        ("root", ctypes.c_ulong),
+        ("class_", ctypes.c_int),
+        ("bit_gravity", ctypes.c_int),
+        ("win_gravity", ctypes.c_int),
+        ("backing_store", ctypes.c_int),
+        ("backing_planes", ctypes.c_ulong),
+        ("backing_pixel", ctypes.c_ulong),
+        ("save_under", ctypes.c_int),
+        ("colormap", ctypes.c_ulong),
+        ("map_installed", ctypes.c_int),
+        ("map_state", ctypes.c_int),
+        ("all_event_masks", ctypes.c_long),
+        ("your_event_mask", ctypes.c_long),
+        ("do_not_propagate_mask", ctypes.c_long),
+        ("override_redirect", ctypes.c_int),
+        ("screen", ctypes.c_void_p),
+    ]
+
+
+_ERROR_HANDLER = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p,
+                                  ctypes.c_void_p)
+
+
+class _X11Stacking:
+    """Geometry of the managed windows, bottom to top, via Xlib."""
+
+    def __init__(self):
+        path = ctypes.util.find_library("X11")
+        if not path:
+            raise OSError("libX11 not found")
+        x = ctypes.CDLL(path)
+        vp, ul = ctypes.c_void_p, ctypes.c_ulong
+        x.XOpenDisplay.restype = vp
+        x.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x.XDefaultRootWindow.restype = ul
+        x.XDefaultRootWindow.argtypes = [vp]
+        x.XInternAtom.restype = ul
+        x.XInternAtom.argtypes = [vp, ctypes.c_char_p, ctypes.c_int]
+        x.XGetWindowProperty.argtypes = [
+            vp, ul, ul, ctypes.c_long, ctypes.c_long, ctypes.c_int, ul,
+            ctypes.POINTER(ul), ctypes.POINTER(ctypes.c_int),
+            ctypes.POINTER(ul), ctypes.POINTER(ul),
+            ctypes.POINTER(ctypes.POINTER(ul))]
+        x.XGetWindowAttributes.argtypes = [
+            vp, ul, ctypes.POINTER(_XWindowAttributes)]
+        x.XTranslateCoordinates.argtypes = [
+            vp, ul, ul, ctypes.c_int, ctypes.c_int,
+            ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int),
+            ctypes.POINTER(ul)]
+        x.XSetErrorHandler.restype = vp
+        x.XSetErrorHandler.argtypes = [vp]
+        x.XFree.argtypes = [vp]
+        x.XSync.argtypes = [vp, ctypes.c_int]
+        x.XCloseDisplay.argtypes = [vp]
+
+        display = x.XOpenDisplay(None)
+        if not display:
+            raise OSError("cannot open X display")
+        self._x = x
+        self._display = display
+        self._root = x.XDefaultRootWindow(display)
+        self._stacking = x.XInternAtom(
+            display, b"_NET_CLIENT_LIST_STACKING", False)
+        # Windows can vanish between listing and querying them; BadWindow
+        # must not reach the default handler, which exits the process
+        self._ignore_errors = _ERROR_HANDLER(lambda display, event: 0)
+
+    def windows(self):
+        """[(window id, QRect, opaque)] of viewable windows, bottom first."""
+        x, dpy = self._x, self._display
+        previous = x.XSetErrorHandler(
+            ctypes.cast(self._ignore_errors, ctypes.c_void_p))
+        try:
+            ids = self._stacking_order()
+            result = []
+            attrs = _XWindowAttributes()
+            rx, ry = ctypes.c_int(), ctypes.c_int()
+            child = ctypes.c_ulong()
+            for wid in ids:
+                if not x.XGetWindowAttributes(dpy, wid, ctypes.byref(attrs)):
+                    continue
+                if attrs.map_state != _IS_VIEWABLE:
+                    continue
+                if not x.XTranslateCoordinates(
+                        dpy, wid, self._root, 0, 0, ctypes.byref(rx),
+                        ctypes.byref(ry), ctypes.byref(child)):
+                    continue
+                rect = QRect(rx.value, ry.value, attrs.width, attrs.height)
+                result.append((wid, rect, attrs.depth != 32))
+            x.XSync(dpy, False)
+            return result
+        finally:
+            x.XSetErrorHandler(previous)
+
+    def _stacking_order(self):
+        x = self._x
+        actual_type, actual_format = ctypes.c_ulong(), ctypes.c_int()
+        nitems, after = ctypes.c_ulong(), ctypes.c_ulong()
+        data = ctypes.POINTER(ctypes.c_ulong)()
+        status = x.XGetWindowProperty(
+            self._display, self._root, self._stacking, 0, 4096, False,
+            _XA_WINDOW, ctypes.byref(actual_type), ctypes.byref(actual_format),
+            ctypes.byref(nitems), ctypes.byref(after), ctypes.byref(data))
+        if status != _SUCCESS or not data:
+            return []
+        try:
+            return [data[i] for i in range(nitems.value)]
+        finally:
+            x.XFree(data)
+
+    def close(self):
+        if self._display:
+            self._x.XCloseDisplay(self._display)
+            self._display = None
+
+
+def native_geometry(widget):
+    """widget.geometry() in native (X) pixels.
+
+    Qt scales each screen about its top-left corner, which is at the same
+    place in logical and native coordinates.
+    """
+    geo = widget.geometry()
+    dpr = widget.devicePixelRatioF()
+    if dpr == 1:
+        return geo
+    handle = widget.windowHandle()
+    origin = QPoint()
+    if handle is not None and handle.screen() is not None:
+        origin = handle.screen().geometry().topLeft()
+    ox, oy = origin.x(), origin.y()
+    # Rounded outward: a partly covered edge pixel leaves the ghost visible
+    return QRectF(ox + (geo.x() - ox) * dpr, oy + (geo.y() - oy) * dpr,
+                  geo.width() * dpr, geo.height() * dpr).toAlignedRect()
+
+
+class OcclusionMonitor(QObject):
+    """Cached cover regions for watched top-level widgets."""
+
+    def __init__(self, clock, interval=1.0, parent=None):
+        super().__init__(parent)
+        self._widgets = []
+        self._cover = {}    # window id -> QRegion of opaque windows above
+        try:
+            self._stacking = _X11Stacking()
+        except OSError:
+            self._stacking = None
+        else:
+            clock.call_every(interval, self.refresh)
+
+    @property
+    def active(self):
+        return self._stacking is not None
+
+    def watch(self, widget):
+        self._widgets.append(widget)
+
+    def unwatch(self, widget):
+        if widget in self._widgets:
+            self._widgets.remove(widget)
+
+    def covered(self, widget):
+        """Whether widget is entirely hidden under other windows."""
+        cover = self._cover.get(int(widget.winId()))
+        if cover is None:
+            return False
+        return QRegion(native_geometry(widget)).subtracted(cover).isEmpty()
+
+    def refresh(self):
+        """Re-read the stacking order and window geometry."""
+        if self._stacking is None or not self._widgets:
+            return
+        ours = {int(w.winId()) for w in self._widgets}
+        try:
+            windows = self._stacking.windows()
+        except Exception:
+            # Never let a broken query hide the ghost
+            windows = []
+        self._cover.clear()
+        above = QRegion()
+        # Walk top to bottom, growing the region above each window
+        for wid, rect, opaque in reversed(windows):
+            if wid in ours:
+                self._cover[wid] = QRegion(above)
+            elif opaque:
+                above += rect
@@ -0,0 +1,134 @@
+"""Power profiles, and picking one from the battery state.
+
+A profile trims what the ghost costs to run: a frame rate cap,
+antialiasing of what is still drawn as vectors, the sparkle and arm
+effects, and how often scares come around. Config.power is the profile
+in effect: the one chosen in settings, or for "auto" the one PowerMonitor
+last picked from the power supply:
+
+- on AC power: performance
+- on battery: balanced, or saver at SAVER_BELOW percent and under
+
+PowerMonitor reads /sys/class/power_supply, or where that has no
+battery info (containers, some sandboxes), asks UPower on the system
+D-Bus. Neither available means AC power.
+"""
+
+import glob
+import os
+from collections import namedtuple
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+try:
+    from PyQt5.QtDBus import QDBusConnection, QDBusInterface
+except ImportError:
+    QDBusConnection = None
+
+Profile = namedtuple("Profile", "fps_cap antialias sparkles arms scare_factor")
+
+PROFILES = {
+    "performance": Profile(fps_cap=None, antialias=True, sparkles=True,
+                           arms=True, scare_factor=1.0),
+    "balanced": Profile(fps_cap=20, antialias=True, sparkles=True,
+                        arms=True, scare_factor=1.5),
+    "saver": Profile(fps_cap=10, antialias=False, sparkles=False,
+                     arms=False, scare_factor=3.0),
+}
+
+# Choices offered in settings, "auto" first
+CHOICES = ("auto",) + tuple(PROFILES)
+
+SAVER_BELOW = 30  # battery percent
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def read_sysfs(root="/sys/class/power_supply"):
+    """(on_battery, percent or None), or None without battery info."""
+    on_ac = None
+    batteries = []
+    for supply in glob.glob(os.path.join(root, "*")):
+        kind = _read(os.path.join(supply, "type"))
+        if kind == "Mains":
+            online = _read(os.path.join(supply, "online"))
+            on_ac = bool(on_ac) or online == "1"
+        elif kind == "Battery":
+            # Peripherals (mice, keyboards) report as batteries too
+            if _read(os.path.join(supply, "scope")) == "Device":
+                continue
+            status = _read(os.path.join(supply, "status"))
+            capacity = _read(os.path.join(supply, "capacity"))
+            batteries.append((status,
+                              int(capacity) if capacity else None))
+    if not batteries:
+        return None
+    discharging = any(status == "Discharging" for status, _ in batteries)
+    on_battery = discharging if on_ac is None else (not on_ac and discharging)
+    levels = [c for _, c in batteries if c is not None]
+    return on_battery, (min(levels) if levels else None)
+
+
+def read_upower():
+    """(on_battery, percent or None) from UPower, or None."""
+    if QDBusConnection is None:
+        return None
+    bus = QDBusConnection.systemBus()
+    if not bus.isConnected():
+        return None
+    props = QDBusInterface(
+        "org.freedesktop.UPower", "/org/freedesktop/UPower",
+        "org.freedesktop.DBus.Properties", bus)
+    if not props.isValid():
+        return None
+    reply = props.call("Get", "org.freedesktop.UPower", "OnBattery")
+    args = reply.arguments()
+    if not args:
+        return None
+    on_battery = bool(args[0])
+
+    percent = None
+    device = QDBusInterface(
+        "org.freedesktop.UPower",
+        "/org/freedesktop/UPower/devices/DisplayDevice",
+        "org.freedesktop.DBus.Properties", bus)
+    if device.isValid():
+        args = device.call("Get", "org.freedesktop.UPower.Device",
+                           "Percentage").arguments()
+        if args:
+            percent = int(args[0])
+    return on_battery, percent
+
+
+def pick_profile(on_battery, percent):
+    if not on_battery:
+        return "performance"
+    if percent is not None and percent <= SAVER_BELOW:
+        return "saver"
+    return "balanced"
+
+
+class PowerMonitor(QObject):
+    """Keeps config.auto_profile in step with the power supply."""
+
+    changed = pyqtSignal(str)
+
+    def __init__(self, config, clock, interval=30.0, parent=None):
+        super().__init__(parent)
+        self.config = config
+        self.refresh()
+        clock.call_every(interval, self.refresh)
+
+    def refresh(self):
+        status = read_sysfs() or read_upower()
+        name = pick_profile(*status) if status else "performance"
+        if name != self.config.auto_profile:
+            self.config.auto_profile = name
+            if self.config.power_profile == "auto":
+                self.changed.emit(name)
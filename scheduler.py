@@ -0,0 +1,70 @@
+"""Timed-event heap shared by the frame clock and the simulation.
+
+Pure Python with no Qt dependency, so it works in headless simulation.
+"""
+
+import heapq
+import itertools
+
+
+class Event:
+    """Handle for a scheduled callback."""
+
+    __slots__ = ("due", "callback", "interval", "cancelled")
+
+    def __init__(self, due, callback, interval=None):
+        self.due = due
+        self.callback = callback
+        self.interval = interval
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    @property
+    def active(self):
+        return not self.cancelled
+
+
+class EventQueue:
+    """Min-heap of timed callbacks. Pure Python, no Qt."""
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+
+    def schedule(self, due, callback, interval=None):
+        ev = Event(due, callback, interval)
+        heapq.heappush(self._heap, (due, next(self._seq), ev))
+        return ev
+
+    def next_due(self):
+        """Due time of the earliest live event, or None."""
+        heap = self._heap
+        while heap and heap[0][2].cancelled:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def run_due(self, now):
+        """Run every event due at or before now, in due order."""
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, _, ev = heapq.heappop(heap)
+            if ev.cancelled:
+                continue
+            if ev.interval is not None:
+                # Repeating: keep cadence, but skip intervals missed
+                # during a stall so it runs at most once per call
+                ev.due += ev.interval
+                if ev.due <= now:
+                    missed = (now - ev.due) // ev.interval + 1
+                    ev.due += missed * ev.interval
+                heapq.heappush(heap, (ev.due, next(self._seq), ev))
+            else:
+                ev.cancelled = True
+            ev.callback()
+
+    def clear(self):
+        for _, _, ev in self._heap:
+            ev.cancelled = True
+        self._heap.clear()
@@ -0,0 +1,92 @@
+"""Keeping ghosts from piling on top of each other.
+
+Neighbors are found with a uniform-grid spatial hash: each point goes in
+the cell of side `radius` it falls in, and only the 3x3 block of cells
+around a point can hold points within `radius` of it. Building the grid
+and querying every point is O(N) for evenly spread ghosts, against the
+O(N²) of comparing every pair. Qt-free.
+"""
+
+import math
+from collections import defaultdict
+
+# Ghosts closer than this (base pixels, before ghost_scale) push apart;
+# a little over the body width so they keep a visible gap
+RADIUS = 90
+# Cap on the summed push, as a fraction of drift speed
+MAX_PUSH = 1.5
+
+
+class SpatialHash:
+    """Uniform grid of point indices keyed by integer cell."""
+
+    def __init__(self, cell):
+        self.cell = cell
+        self._cells = defaultdict(list)
+
+    def rebuild(self, points):
+        self._cells.clear()
+        cell = self.cell
+        for i, (x, y) in enumerate(points):
+            self._cells[(math.floor(x / cell), math.floor(y / cell))].append(i)
+
+    def near(self, x, y):
+        """Indices of points in the 3x3 cells around (x, y)."""
+        cx, cy = math.floor(x / self.cell), math.floor(y / self.cell)
+        cells = self._cells
+        for gx in (cx - 1, cx, cx + 1):
+            for gy in (cy - 1, cy, cy + 1):
+                bucket = cells.get((gx, gy))
+                if bucket:
+                    yield from bucket
+
+
+def separation(points, radius, grid=None):
+    """Push vectors steering each point away from its close neighbors.
+
+    Each neighbor within radius contributes a unit vector away from it,
+    weighted by 1 - distance / radius; the sum is capped at MAX_PUSH.
+    Returns a list of (px, py), one per point.
+    """
+    grid = grid or SpatialHash(radius)
+    grid.rebuild(points)
+    r2 = radius * radius
+    pushes = []
+    for i, (x, y) in enumerate(points):
+        px = py = 0.0
+        for j in grid.near(x, y):
+            if j == i:
+                continue
+            dx = x - points[j][0]
+            dy = y - points[j][1]
+            d2 = dx * dx + dy * dy
+            if d2 >= r2:
+                continue
+            if d2 == 0:
+                # Exactly on top of each other: split by index
+                dx, dy, d2 = (1.0 if i > j else -1.0), 0.0, 1.0
+            d = math.sqrt(d2)
+            w = (1 - d / radius) / d
+            px += dx * w
+            py += dy * w
+        m = math.hypot(px, py)
+        if m > MAX_PUSH:
+            px *= MAX_PUSH / m
+            py *= MAX_PUSH / m
+        pushes.append((px, py))
+    return pushes
+
+
+def apply(states, config, grid=None):
+    """Set each GhostState's push away from its neighbors."""
+    if not config.separation:
+        for st in states:
+            st.push_x = st.push_y = 0.0
+        return
+    radius = RADIUS * config.ghost_scale
+    if grid is not None:
+        grid.cell = radius
+    pushes = separation(
+        [(st.current_x, st.current_y) for st in states], radius, grid)
+    for st, (px, py) in zip(states, pushes):
+        st.push_x, st.push_y = px, py
@@ -3,9 +3,12 @@
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QGroupBox, QLabel, QSlider,
     QCheckBox, QPlainTextEdit, QPushButton, QScrollArea, QWidget,
+    QComboBox,
 )
 from PyQt5.QtCore import Qt
 
+import power
+
 
 class SettingsDialog(QDialog):
     """Settings dialog for configuring the ghost pet."""
@@ -29,6 +32,9 @@ class SettingsDialog(QDialog):
         movement_layout = QVBoxLayout(movement_group)
         self.speed_slider = self._add_slider(
             movement_layout, "Speed", 1, 20, config.speed)
+        self.separation_cb = QCheckBox("Keep ghosts apart (with --count)")
+        self.separation_cb.setChecked(config.separation)
+        movement_layout.addWidget(self.separation_cb)
         scroll_layout.addWidget(movement_group)
 
         # ── Speech ──
@@ -87,6 +93,25 @@ class SettingsDialog(QDialog):
             appearance_layout, "Ghost scale", 5, 30, config.ghost_scale, 10)
         scroll_layout.addWidget(appearance_group)
 
+        # ── Frame rate ──
+        fps_group = QGroupBox("Frame rate")
+        fps_layout = QVBoxLayout(fps_group)
+        fps_layout.addWidget(QLabel("Power profile:"))
+        self.power_combo = QComboBox()
+        for name in power.CHOICES:
+            label = ("Auto (lighter on battery)" if name == "auto"
+                     else name.capitalize())
+            self.power_combo.addItem(label, name)
+        self._set_power_choice(config.power_profile)
+        fps_layout.addWidget(self.power_combo)
+        self.fps_active_slider = self._add_slider(
+            fps_layout, "While animating (fps)", 10, 60, config.fps_active)
+        self.fps_drift_slider = self._add_slider(
+            fps_layout, "While drifting (fps)", 2, 30, config.fps_drift)
+        self.fps_faded_slider = self._add_slider(
+            fps_layout, "While faded out (fps)", 1, 10, config.fps_faded)
+        scroll_layout.addWidget(fps_group)
+
         scroll.setWidget(scroll_widget)
         layout.addWidget(scroll)
 
@@ -146,11 +171,16 @@ class SettingsDialog(QDialog):
             / self.opacity_speed_slider._divisor)
         self.config.opacity_min = self.opacity_min_slider.value() / 100.0
         self.config.opacity_max = self.opacity_max_slider.value() / 100.0
+        self.config.separation = self.separation_cb.isChecked()
         self.config.scare_enabled = self.scare_enabled_cb.isChecked()
         self.config.scare_min_minutes = self.scare_min_slider.value()
         self.config.scare_max_minutes = self.scare_max_slider.value()
         self.config.ghost_scale = (
             self.scale_slider.value() / self.scale_slider._divisor)
+        self.config.power_profile = self.power_combo.currentData()
+        self.config.fps_active = self.fps_active_slider.value()
+        self.config.fps_drift = self.fps_drift_slider.value()
+        self.config.fps_faded = self.fps_faded_slider.value()
         self.config.custom_phrases = self._parse_lines(self.phrases_text)
         self.config.custom_scare_phrases = self._parse_lines(
             self.scare_phrases_text)
@@ -170,13 +200,22 @@ class SettingsDialog(QDialog):
             int(self.config.opacity_min * 100))
         self.opacity_max_slider.setValue(
             int(self.config.opacity_max * 100))
+        self.separation_cb.setChecked(self.config.separation)
         self.scare_enabled_cb.setChecked(self.config.scare_enabled)
         self.scare_min_slider.setValue(self.config.scare_min_minutes)
         self.scare_max_slider.setValue(self.config.scare_max_minutes)
         self.scale_slider.setValue(
             int(self.config.ghost_scale * self.scale_slider._divisor))
+        self._set_power_choice(self.config.power_profile)
+        self.fps_active_slider.setValue(self.config.fps_active)
+        self.fps_drift_slider.setValue(self.config.fps_drift)
+        self.fps_faded_slider.setValue(self.config.fps_faded)
         self.phrases_text.setPlainText("")
         self.scare_phrases_text.setPlainText("")
 
         self.config.save()
         self.ghost.apply_config()
+
+    def _set_power_choice(self, name):
+        index = self.power_combo.findData(name)
+        self.power_combo.setCurrentIndex(max(0, index))
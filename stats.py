@@ -0,0 +1,222 @@
+"""Frame-time profiler and on-screen stats HUD (--stats).
+
+Profiler.instrument() wraps the hot entry points of a ghost, a ghost
+group, a flock or a swarm with timers, per instance, so nothing is
+timed unless --stats is given:
+
+- sim:   the simulation step (GhostState.step, or the flock/swarm tick)
+- paint: paintEvent of each ghost or overlay window
+- move:  GhostPet.move(), i.e. the X ConfigureWindow round trip
+
+Each keeps a rolling window of samples for percentiles and a histogram.
+Once a second the profiler also samples the frame clock's wakeups and
+frames (the difference is wakeups for timed events alone) and the
+process RSS. StatsHud shows the latest numbers in a small window next
+to the ghost. dump() writes everything as JSON.
+"""
+
+import bisect
+import json
+import os
+import time
+from collections import deque
+
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtCore import Qt, QObject, QRect
+from PyQt5.QtGui import QPainter, QColor, QFont
+
+# Histogram bucket upper bounds, in milliseconds
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 50, 100)
+
+
+def rss_bytes():
+    """Current resident set size, or None where /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class RollingHistogram:
+    """The last `window` samples (ms), with summary statistics."""
+
+    def __init__(self, window=2000):
+        self.samples = deque(maxlen=window)
+        self.total = 0
+
+    def add(self, ms):
+        self.samples.append(ms)
+        self.total += 1
+
+    def summary(self):
+        ms = sorted(self.samples)
+        if not ms:
+            return {"count": self.total}
+
+        def pct(p):
+            return ms[min(len(ms) - 1, int(round(p / 100 * (len(ms) - 1))))]
+
+        counts = [0] * (len(BUCKETS_MS) + 1)
+        for x in ms:
+            counts[bisect.bisect_left(BUCKETS_MS, x)] += 1
+        labels = [f"<={b:g}ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]:g}ms"]
+        return {
+            "count": self.total,
+            "window": len(ms),
+            "mean_ms": sum(ms) / len(ms),
+            "p50_ms": pct(50),
+            "p90_ms": pct(90),
+            "p99_ms": pct(99),
+            "max_ms": ms[-1],
+            "histogram": dict(zip(labels, counts)),
+        }
+
+
+class Profiler(QObject):
+    """Rolling timings of instrumented ghosts plus per-second rates."""
+
+    SECTIONS = ("sim", "paint", "move")
+
+    def __init__(self, clock, parent=None):
+        super().__init__(parent)
+        self._clock = clock
+        self.started = time.time()
+        self.sections = {name: RollingHistogram() for name in self.SECTIONS}
+        # One entry per second: (wakeups, frames, rss bytes)
+        self.rates = deque(maxlen=300)
+        self.listeners = []
+        self._last = (clock.wakeups, clock.frames)
+        clock.call_every(1.0, self._sample)
+
+    def instrument(self, target):
+        """Time a GhostPet, _GhostGroup, GhostFlock or SwarmFlock."""
+        if hasattr(target, "ghosts"):
+            for ghost in target.ghosts:
+                self.instrument(ghost)
+        elif hasattr(target, "overlays"):
+            engine = getattr(target, "engine", None)
+            if engine is not None:
+                self._wrap(engine, "step", "sim")
+            else:
+                self._wrap(target, "_tick", "sim")
+            for overlay in target.overlays:
+                self._wrap(overlay, "paintEvent", "paint")
+        else:
+            self._wrap(target.state, "step", "sim")
+            self._wrap(target, "paintEvent", "paint")
+            self._wrap(target, "move", "move")
+
+    def _wrap(self, obj, attr, section):
+        fn = getattr(obj, attr)
+        hist = self.sections[section]
+        clock = time.perf_counter_ns
+
+        def timed(*args):
+            t0 = clock()
+            try:
+                return fn(*args)
+            finally:
+                hist.add((clock() - t0) / 1e6)
+
+        setattr(obj, attr, timed)
+
+    def _sample(self):
+        wakeups, frames = self._clock.wakeups, self._clock.frames
+        last_wakeups, last_frames = self._last
+        self._last = (wakeups, frames)
+        self.rates.append((wakeups - last_wakeups, frames - last_frames,
+                           rss_bytes()))
+        for listener in self.listeners:
+            listener()
+
+    def snapshot(self):
+        """Everything collected so far, JSON-ready."""
+        wakeups, frames, rss = self.rates[-1] if self.rates else (0, 0, None)
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S%z",
+                                     time.localtime(self.started)),
+            "uptime_s": time.time() - self.started,
+            "fps_target": self._clock.fps,
+            "wakeups_per_s": wakeups,
+            "frames_per_s": frames,
+            "rss_bytes": rss,
+            "sections": {name: hist.summary()
+                         for name, hist in self.sections.items()},
+            "per_second": [
+                {"wakeups": w, "frames": f, "rss_bytes": r}
+                for w, f, r in self.rates
+            ],
+        }
+
+    def dump(self, path=None):
+        """Write snapshot() to path (default: the cache dir); returns it."""
+        if path is None:
+            cache = os.environ.get(
+                "XDG_CACHE_HOME",
+                os.path.join(os.path.expanduser("~"), ".cache"))
+            path = os.path.join(
+                cache, "ghost-pet",
+                time.strftime("stats-%Y%m%d-%H%M%S.json"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        return path
+
+
+class StatsHud(QWidget):
+    """Small translucent readout that follows a window around."""
+
+    W, H = 240, 58
+
+    def __init__(self, profiler, anchor):
+        super().__init__()
+        self._profiler = profiler
+        self._anchor = anchor
+        self._lines = ["collecting..."]
+        self.setWindowFlags(
+            Qt.FramelessWindowHint |
+            Qt.Tool |
+            Qt.WindowTransparentForInput
+        )
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.setAttribute(Qt.WA_ShowWithoutActivating)
+        self.setFixedSize(self.W, self.H)
+        self._font = QFont("Monospace", 8)
+        profiler.listeners.append(self.refresh)
+
+    def refresh(self):
+        snap = self._profiler.snapshot()
+
+        def p50(name):
+            s = snap["sections"][name]
+            return f"{s['p50_ms']:.2f}" if "p50_ms" in s else "-"
+
+        rss = snap["rss_bytes"]
+        self._lines = [
+            f"sim {p50('sim')}  paint {p50('paint')}  move {p50('move')} ms",
+            f"wakeups {snap['wakeups_per_s']}/s  frames "
+            f"{snap['frames_per_s']}/s",
+            f"target {snap['fps_target']} fps  RSS "
+            + (f"{rss / 2**20:.0f} MiB" if rss is not None else "?"),
+        ]
+        geo = self._anchor.geometry()
+        if self._anchor.width() < self.W * 3:
+            # A ghost window: sit beside it
+            self.move(geo.right() + 4, geo.top())
+        else:
+            # A screen overlay: top-left corner
+            self.move(geo.left() + 10, geo.top() + 10)
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(20, 20, 30, 190))
+        painter.drawRoundedRect(self.rect(), 6, 6)
+        painter.setPen(QColor(220, 220, 230))
+        painter.setFont(self._font)
+        for i, line in enumerate(self._lines):
+            painter.drawText(QRect(8, 5 + i * 16, self.W - 12, 16),
+                             Qt.AlignLeft | Qt.AlignVCenter, line)
@@ -0,0 +1,441 @@
+"""Vectorized swarm engine for hundreds of ghosts.
+
+SwarmEngine keeps the state of N ghosts in NumPy arrays (positions,
+targets, phases, opacity, blink/sparkle/mouth timers) and advances all
+of them with array math each step, instead of N GhostState objects each
+calling math.sqrt/math.sin. The behavior follows GhostState: drift
+toward random targets, a three-harmonic opacity wave, float bobbing,
+blinks, sparkles, mouth expressions and timed scares (all N at once,
+honoring scare_enabled, scare_min/max_minutes and the power profile's
+scare_factor). Speech and arms are left out — a wall of 500 bubbles
+isn't readable anyway.
+
+SwarmFlock presents a SwarmEngine through the same per-screen
+GhostOverlay windows as GhostFlock. Requires NumPy.
+"""
+
+import math
+
+import numpy as np
+
+from PyQt5.QtCore import QObject, QPointF, QRectF, QRect
+from PyQt5.QtGui import QPainter
+
+import ghost_render
+import oscillators
+import separation
+from ghost_overlay import GhostOverlay, warm_overlays
+from ghost_state import GhostState
+
+_EYES = ("open", "closed", "squint")
+_MOUTHS = ("normal", "O", "happy")
+
+
+class SwarmEngine:
+    """Array-backed simulation of N ghosts."""
+
+    SPEED_UNIT = GhostState.SPEED_UNIT
+    SCARE_DURATION = GhostState.SCARE_DURATION
+    MARGIN = 100
+
+    def __init__(self, config, count, bounds, seed=None):
+        self.config = config
+        self.n = count
+        self.rng = np.random.default_rng(seed)
+        self.bounds = bounds
+        self.t = 0.0
+
+        rng, n = self.rng, count
+        self.pos = self._random_points(n)
+        self.target = self._random_points(n)
+        self.direction = np.where(self.target[:, 0] > self.pos[:, 0], 1, -1)
+        self.wander_due = rng.uniform(0.0, 5.0, n)
+
+        # Per-ghost phases so the swarm doesn't breathe and bob in unison
+        self.opacity_phases = rng.uniform(0.0, math.tau, (n, 3))
+        self.float_phase = rng.uniform(0.0, math.tau, n)
+        self.tail_phase = rng.uniform(0.0, math.tau, n)
+        self.float_offset = np.zeros(n)
+        self.opacity = np.ones(n)
+
+        # Timers: *_due is when the effect next starts, *_until when it ends
+        self.blinking = np.zeros(n, bool)
+        self.blink_style = np.ones(n, np.int8)    # index into _EYES
+        self.blink_due = rng.uniform(3.0, 7.0, n)
+        self.blink_until = np.zeros(n)
+        self.sparkling = np.zeros(n, bool)
+        self.sparkle_start = np.zeros(n)
+        self.sparkle_due = rng.uniform(20.0, 40.0, n)
+        self.mouth = np.zeros(n, np.int8)         # index into _MOUTHS
+        self.mouth_start = np.zeros(n)
+        self.mouth_due = rng.uniform(10.0, 25.0, n)
+        self.mouth_until = np.zeros(n)
+
+        self.scare_start = None
+        self.scare_due = self._next_scare()
+        self._update_float()
+
+    def _random_points(self, k):
+        x, y, right, bottom = self.bounds
+        m = self.MARGIN
+        return np.column_stack((
+            self.rng.integers(x + m, right - m, k, endpoint=True),
+            self.rng.integers(y + m, bottom - m, k, endpoint=True),
+        )).astype(float)
+
+    def _next_scare(self):
+        """Time of the next timed scare, as GhostState schedules it."""
+        lo = self.config.scare_min_minutes * 60
+        hi = self.config.scare_max_minutes * 60
+        if lo > hi:
+            lo, hi = hi, lo
+        return self.t + self.rng.uniform(lo, hi) * self.config.power.scare_factor
+
+    # ── stepping ─────────────────────────────────────────────────
+
+    def step(self, dt):
+        self.t += dt
+        self._update_position(dt)
+        self._update_timers()
+        self._update_float()
+
+    def _update_position(self, dt):
+        step = self.config.speed * dt / self.SPEED_UNIT
+        if self.config.separation and self.n > 1:
+            radius = separation.RADIUS * self.config.ghost_scale
+            self.pos += separation_pushes(self.pos, radius) * step
+            x, y, right, bottom = self.bounds
+            m = self.MARGIN // 2
+            np.clip(self.pos[:, 0], x + m, right - m, out=self.pos[:, 0])
+            np.clip(self.pos[:, 1], y + m, bottom - m, out=self.pos[:, 1])
+        delta = self.target - self.pos
+        dist = np.hypot(delta[:, 0], delta[:, 1])
+        # <=, so a zero step at the target (dist 0) never divides 0 by 0
+        arrived = dist <= step
+        moving = ~arrived
+        self.pos[moving] += delta[moving] * (step / dist[moving])[:, None]
+        self.pos[arrived] = self.target[arrived]
+
+        # New destination on arrival, and every 5 s regardless
+        wander = self.t >= self.wander_due
+        retarget = arrived | wander
+        k = int(retarget.sum())
+        if k:
+            self.target[retarget] = self._random_points(k)
+            self.direction[retarget] = np.where(
+                self.target[retarget, 0] > self.pos[retarget, 0], 1, -1)
+        self.wander_due[wander] += 5.0
+
+    def _update_timers(self):
+        t, rng = self.t, self.rng
+
+        # Blinks: 2/3 closed, 1/3 squint (><)
+        end = self.blinking & (t >= self.blink_until)
+        self.blinking[end] = False
+        self.blink_due[end] = t + rng.uniform(3.0, 7.0, int(end.sum()))
+        start = ~self.blinking & (t >= self.blink_due)
+        k = int(start.sum())
+        if k:
+            style = np.where(rng.random(k) < 2 / 3, 1, 2).astype(np.int8)
+            self.blink_style[start] = style
+            self.blink_until[start] = t + np.where(style == 1, 0.15, 0.3)
+            self.blinking[start] = True
+
+        # Sparkly eyes for 2 s every 20-40 s
+        end = self.sparkling & (t >= self.sparkle_start + 2.0)
+        self.sparkling[end] = False
+        self.sparkle_due[end] = t + rng.uniform(20.0, 40.0, int(end.sum()))
+        start = ~self.sparkling & (t >= self.sparkle_due)
+        if not self.config.power.sparkles:
+            # Power saving; try again next time around
+            self.sparkle_due[start] = t + rng.uniform(
+                20.0, 40.0, int(start.sum()))
+        else:
+            self.sparkling[start] = True
+            self.sparkle_start[start] = t
+
+        # Mouth expressions every 10-25 s
+        end = (self.mouth != 0) & (t >= self.mouth_until)
+        self.mouth[end] = 0
+        self.mouth_due[end] = t + rng.uniform(10.0, 25.0, int(end.sum()))
+        start = (self.mouth == 0) & (t >= self.mouth_due)
+        k = int(start.sum())
+        if k:
+            mouth = rng.integers(1, 2, k, endpoint=True).astype(np.int8)
+            self.mouth[start] = mouth
+            self.mouth_start[start] = t
+            self.mouth_until[start] = t + np.where(mouth == 1, 1.5, 2.0)
+
+        # Scares, timed or manual, restart the timer when they end
+        if self.scare_start is not None and (
+                t - self.scare_start >= self.SCARE_DURATION):
+            self.scare_start = None
+            self.scare_due = self._next_scare()
+        elif self.scare_start is None and t >= self.scare_due:
+            if self.config.scare_enabled:
+                self.scare()
+            else:
+                self.scare_due = self._next_scare()
+
+    def _update_float(self):
+        t = self.t
+        self.float_offset = oscillators.FLOAT.batch(
+            t, self.float_phase[:, None])
+
+        if self.scare_start is not None:
+            # Same fade curve as GhostState: in 30%, hold 40%, out 30%
+            f = (t - self.scare_start) / self.SCARE_DURATION
+            if f < 0.3:
+                opacity = f / 0.3
+            elif f < 0.7:
+                opacity = 1.0
+            else:
+                opacity = max(0.0, 1.0 - (f - 0.7) / 0.3)
+            self.opacity.fill(opacity)
+            return
+
+        wave = oscillators.OPACITY.batch(t, self.opacity_phases,
+                                         self.config.opacity_speed)
+        np.clip(0.55 + wave, self.config.opacity_min, self.config.opacity_max,
+                out=self.opacity)
+
+    def scare(self):
+        if self.scare_start is None:
+            self.scare_start = self.t
+            self.opacity.fill(0.0)
+
+    def frame_rate(self):
+        if (self.scare_start is not None or self.sparkling.any()
+                or (self.mouth == 1).any()):
+            fps = self.config.fps_active
+        elif (self.opacity <= self.config.opacity_min + 0.001).all():
+            fps = self.config.fps_faded
+        else:
+            fps = self.config.fps_drift
+        cap = self.config.power.fps_cap
+        return fps if cap is None else min(fps, cap)
+
+    # ── sprite keys ──────────────────────────────────────────────
+
+    def sprite_keys(self):
+        """Per-ghost (tail frame, eyes index, sparkle frame or -1) arrays."""
+        t = self.t
+        tail = ((t * 3 + self.tail_phase) / math.tau
+                * ghost_render.TAIL_FRAMES).astype(np.int64)
+        tail %= ghost_render.TAIL_FRAMES
+        eyes = np.where(self.blinking, self.blink_style, 0)
+        sparkle = ((t - self.sparkle_start) * 4 / ghost_render.SPARKLE_PERIOD
+                   * ghost_render.SPARKLE_FRAMES).astype(np.int64)
+        sparkle %= ghost_render.SPARKLE_FRAMES
+        sparkle = np.where(self.sparkling & (eyes == 0), sparkle, -1)
+        return tail, eyes, sparkle
+
+
+def separation_pushes(pos, radius):
+    """Vectorized separation.separation() for an (N, 2) position array.
+
+    The spatial hash is a sort: points are ordered by cell id, so each
+    cell is a contiguous run found with searchsorted. Candidate pairs are
+    then every point against each of the runs of its 3x3 neighbor cells,
+    expanded with np.repeat, which keeps the work O(N + pairs).
+    """
+    n = len(pos)
+    cell = np.floor(pos / radius).astype(np.int64)
+    cell -= cell.min(axis=0)
+    width = int(cell[:, 0].max()) + 3   # room for the -1/+1 neighbors
+    cid = (cell[:, 1] + 1) * width + cell[:, 0] + 1
+    order = np.argsort(cid, kind="stable")
+    sorted_cid = cid[order]
+
+    pairs_i, pairs_j = [], []
+    for oy in (-1, 0, 1):
+        for ox in (-1, 0, 1):
+            ncid = cid + oy * width + ox
+            lo = np.searchsorted(sorted_cid, ncid, "left")
+            hi = np.searchsorted(sorted_cid, ncid, "right")
+            counts = hi - lo
+            total = int(counts.sum())
+            if not total:
+                continue
+            i = np.repeat(np.arange(n), counts)
+            # Position within each run: 0..count-1, offset by run start
+            run = np.arange(total) - np.repeat(np.cumsum(counts) - counts,
+                                               counts)
+            pairs_i.append(i)
+            pairs_j.append(order[np.repeat(lo, counts) + run])
+    i = np.concatenate(pairs_i)
+    j = np.concatenate(pairs_j)
+    keep = i != j
+    i, j = i[keep], j[keep]
+
+    d = pos[i] - pos[j]
+    dist = np.hypot(d[:, 0], d[:, 1])
+    # Exactly on top of each other: split by index
+    same = dist == 0
+    d[same, 0] = np.where(i[same] > j[same], 1.0, -1.0)
+    dist[same] = 1.0
+    close = dist < radius
+    w = (1 - dist[close] / radius) / dist[close]
+    push = np.zeros_like(pos)
+    np.add.at(push, i[close], d[close] * w[:, None])
+
+    m = np.hypot(push[:, 0], push[:, 1])
+    over = m > separation.MAX_PUSH
+    push[over] *= (separation.MAX_PUSH / m[over])[:, None]
+    return push
+
+
+def _grouped(keys):
+    """Yield (key, index array) for each distinct value in keys."""
+    order = np.argsort(keys, kind="stable")
+    uniq, starts = np.unique(keys[order], return_index=True)
+    bounds = list(starts[1:]) + [len(order)]
+    for key, lo, hi in zip(uniq.tolist(), starts.tolist(), bounds):
+        yield key, order[lo:hi]
+
+
+class SwarmFlock(QObject):
+    """Presents a SwarmEngine through per-screen GhostOverlay windows."""
+
+    def __init__(self, config, count, rects, clock, atlas=None, seed=None):
+        super().__init__()
+        self.config = config
+        self._clock = clock
+        self.atlas = atlas or ghost_render.SpriteAtlas()
+        self._scale = config.ghost_scale
+
+        bounds = (min(r.x() for r in rects),
+                  min(r.y() for r in rects),
+                  max(r.x() + r.width() for r in rects),
+                  max(r.y() + r.height() for r in rects))
+        self.engine = SwarmEngine(config, count, bounds, seed)
+        self.overlays = [GhostOverlay(self, rect) for rect in rects]
+        self._drawn = QRect()
+        self._scaring = False
+
+        clock.add_frame_callback(self._on_frame)
+        clock.call_later(0, lambda: warm_overlays(self.atlas, self.overlays,
+                                                  self.config.ghost_scale))
+
+    def show(self):
+        for overlay in self.overlays:
+            overlay.show()
+
+    def apply_config(self):
+        if self.config.ghost_scale != self._scale:
+            self._scale = self.config.ghost_scale
+            self.atlas.clear()
+        self._flush()
+
+    def apply_power(self):
+        """Apply a new power profile: frame rate cap and antialiasing."""
+        for overlay in self.overlays:
+            overlay.update()
+        self._clock.request_fps(self, self.engine.frame_rate())
+
+    def _do_scare(self):
+        self.engine.scare()
+        self._raise_for_scare()
+
+    def _raise_for_scare(self):
+        """Keep the overlays on top while the engine is scaring."""
+        scaring = self.engine.scare_start is not None
+        if scaring == self._scaring:
+            return
+        self._scaring = scaring
+        for overlay in self.overlays:
+            if scaring:
+                overlay.raise_()
+            else:
+                overlay.lower()
+
+    def _on_frame(self, now, dt):
+        self.engine.step(dt)
+        self._raise_for_scare()
+        self._flush()
+        self._clock.request_fps(self, self.engine.frame_rate())
+
+    def _flush(self):
+        """Repaint the box around the whole swarm (old and new)."""
+        e, s = self.engine, self.config.ghost_scale
+        pad = ghost_render.GHOST_W * s
+        lo = e.pos.min(axis=0) - pad
+        hi = e.pos.max(axis=0) + pad
+        box = QRect(int(lo[0]), int(lo[1] - 10),
+                    int(hi[0] - lo[0]), int(hi[1] - lo[1] + 20))
+        dirty = box.united(self._drawn)
+        self._drawn = box
+        for overlay in self.overlays:
+            geo = overlay.geometry()
+            part = dirty.intersected(geo)
+            if not part.isEmpty():
+                overlay.update(part.translated(-geo.x(), -geo.y()))
+
+    # ── drawing ──────────────────────────────────────────────────
+
+    def draw(self, painter, area):
+        """Draw every ghost touching area with batched fragments."""
+        e, s = self.engine, self.config.ghost_scale
+
+        # Ghost box origins (screen coordinates), culled to area
+        ox = e.pos[:, 0] - ghost_render.CX * s
+        oy = e.pos[:, 1] - ghost_render.CY * s + e.float_offset
+        br = ghost_render.BODY_RECT
+        visible = ((ox + br.right() * s >= area.left())
+                   & (ox + br.left() * s <= area.right())
+                   & (oy + br.bottom() * s >= area.top())
+                   & (oy + br.top() * s <= area.bottom()))
+        idx = np.flatnonzero(visible)
+        if not len(idx):
+            return
+        ox, oy = ox[idx], oy[idx]
+        opacity = e.opacity[idx]
+        direction = e.direction[idx]
+        tail, eyes, sparkle = (k[idx] for k in e.sprite_keys())
+        mouth = e.mouth[idx]
+        # Shake for "O" mouths, mirrored like GhostState's
+        mt = e.t - e.mouth_start[idx]
+        shaking = mouth == 1
+        mx = np.where(shaking, np.sin(mt * 25) * 1.5 * direction, 0.0) * s
+        my = np.where(shaking, np.cos(mt * 30) * 1.0, 0.0) * s
+
+        # One sort key per sprite: bit 0 is the direction, the rest the state
+        dbit = (direction < 0).astype(np.int64)
+        faces = eyes.astype(np.int64) * (ghost_render.SPARKLE_FRAMES + 1)
+        faces += sparkle + 1
+        layers = (
+            (tail * 2 + dbit, ox, oy, br, self._body_sprite),
+            (faces * 2 + dbit, ox, oy, ghost_render.FACE_RECT,
+             self._face_sprite),
+            (mouth.astype(np.int64) * 2 + dbit, ox + mx, oy + my,
+             ghost_render.MOUTH_RECT, self._mouth_sprite),
+        )
+        create = QPainter.PixmapFragment.create
+        ops = opacity.tolist()
+        # Sprites at this screen's pixel ratio; fragments ignore a
+        # pixmap's devicePixelRatio, so they are shrunk back by it
+        dpr = painter.device().devicePixelRatioF()
+        r, k = s * dpr, 1 / dpr
+        for keys, xs, ys, rect, sprite in layers:
+            # Sprites cover their rect grown out to whole device pixels
+            rect = ghost_render.sprite_rect(rect, r)
+            # Fragments are positioned by their center, in logical pixels
+            cx = (xs + (rect.x() + rect.width() / 2) * s).tolist()
+            cy = (ys + (rect.y() + rect.height() / 2) * s).tolist()
+            for key, group in _grouped(keys):
+                pix = sprite(key >> 1, -1 if key & 1 else 1, r)
+                src = QRectF(0, 0, pix.width(), pix.height())
+                frags = [create(QPointF(cx[i], cy[i]), src, k, k, 0, ops[i])
+                         for i in group.tolist()]
+                painter.drawPixmapFragments(frags, pix)
+
+    def _body_sprite(self, tail, direction, scale):
+        return self.atlas.body(tail, direction, scale)
+
+    def _face_sprite(self, face, direction, scale):
+        eyes, sparkle = divmod(face, ghost_render.SPARKLE_FRAMES + 1)
+        return self.atlas.face(_EYES[eyes], sparkle - 1 if sparkle else None,
+                               direction, scale)
+
+    def _mouth_sprite(self, mouth, direction, scale):
+        return self.atlas.mouth(_MOUTHS[mouth], direction, scale)
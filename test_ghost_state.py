@@ -0,0 +1,47 @@
+"""Headless checks of GhostState's timed behavior.
+
+    python3 -m unittest test_ghost_state
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+os.environ.setdefault("GHOST_PET_QPA_PLATFORM", "offscreen")
+# Default settings, not whatever the user has configured
+os.environ["XDG_CONFIG_HOME"] = tempfile.mkdtemp(prefix="ghost-pet-test-")
+
+import ghost_pet
+from ghost_state import GhostState
+
+BOUNDS = (0, 0, 1920, 1080)
+
+
+class ScareScheduleTest(unittest.TestCase):
+
+    def _run(self, manual, hours=6.0):
+        """Scares in hours of simulation after manual scare() calls."""
+        config = ghost_pet.Config()
+        state = GhostState(config, BOUNDS, rng=random.Random(1))
+        scares = []
+        state.listeners.append(
+            lambda name, data: name == "scare" and scares.append(state.t))
+        for _ in range(manual):
+            state.scare()
+            state.step(state.SCARE_DURATION + 1.0)
+        state.step(hours * 3600 - state.t)
+        return config, scares
+
+    def test_manual_scares_keep_one_chain(self):
+        manual = 5
+        config, scares = self._run(manual)
+        # One chain can't fire more often than every scare_min_minutes
+        gap = config.scare_min_minutes * 60
+        self.assertLessEqual(len(scares), 6 * 3600 / gap + manual)
+        auto = scares[manual:]
+        self.assertTrue(all(b - a >= gap for a, b in zip(auto, auto[1:])))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""Checks of OcclusionMonitor.covered() against a fake stacking order.
+
+    python3 -m unittest test_occlusion
+"""
+
+import unittest
+
+from PyQt5.QtCore import QRect
+
+from occlusion import OcclusionMonitor
+
+GHOST_ID = 7
+
+
+class _Clock:
+    def call_every(self, interval, callback):
+        pass
+
+
+class _Stacking:
+    """Stands in for _X11Stacking: windows in native pixels, bottom first."""
+
+    def __init__(self, windows):
+        self._windows = windows
+
+    def windows(self):
+        return self._windows
+
+
+class _Screen:
+    def __init__(self, geometry):
+        self._geometry = geometry
+
+    def geometry(self):
+        return self._geometry
+
+
+class _Handle:
+    def __init__(self, screen):
+        self._screen = screen
+
+    def screen(self):
+        return self._screen
+
+
+class _Widget:
+    """The parts of a ghost window OcclusionMonitor looks at."""
+
+    def __init__(self, geometry, dpr, screen=QRect(0, 0, 1920, 1080)):
+        self._geometry = geometry
+        self._dpr = dpr
+        self._handle = _Handle(_Screen(screen))
+
+    def winId(self):
+        return GHOST_ID
+
+    def geometry(self):
+        return self._geometry
+
+    def devicePixelRatioF(self):
+        return self._dpr
+
+    def windowHandle(self):
+        return self._handle
+
+
+class CoveredTest(unittest.TestCase):
+
+    def _covered(self, widget, native, *above):
+        """covered() with the ghost at native and opaque windows above it."""
+        monitor = OcclusionMonitor(_Clock())
+        monitor._stacking = _Stacking(
+            [(GHOST_ID, native, True)]
+            + [(100 + i, rect, True) for i, rect in enumerate(above)])
+        monitor.watch(widget)
+        monitor.refresh()
+        return monitor.covered(widget)
+
+    def test_dpr_1(self):
+        ghost = _Widget(QRect(100, 100, 220, 210), 1.0)
+        native = QRect(100, 100, 220, 210)
+        self.assertTrue(self._covered(ghost, native, QRect(0, 0, 800, 600)))
+        self.assertFalse(self._covered(ghost, native, QRect(0, 0, 300, 600)))
+        # Together two windows cover what neither does alone
+        self.assertTrue(self._covered(ghost, native, QRect(0, 0, 200, 600),
+                                      QRect(200, 0, 600, 600)))
+
+    def test_dpr_2(self):
+        ghost = _Widget(QRect(100, 100, 220, 210), 2.0)
+        native = QRect(200, 200, 440, 420)
+        self.assertTrue(self._covered(ghost, native, QRect(0, 0, 800, 800)))
+        # Covers the logical rect, but not the ghost on screen
+        self.assertFalse(self._covered(ghost, native, QRect(100, 100, 220, 210)))
+        self.assertFalse(self._covered(ghost, native, QRect(0, 0, 600, 800)))
+
+    def test_dpr_2_second_screen(self):
+        # Screens scale about their own top-left corner
+        ghost = _Widget(QRect(2020, 100, 220, 210), 2.0,
+                        screen=QRect(1920, 0, 1920, 1080))
+        native = QRect(2120, 200, 440, 420)
+        self.assertTrue(self._covered(ghost, native,
+                                      QRect(2000, 0, 800, 800)))
+        self.assertFalse(self._covered(ghost, native,
+                                       QRect(2020, 100, 220, 210)))
+
+
+if __name__ == "__main__":
+    unittest.main()